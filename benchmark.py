@@ -0,0 +1,502 @@
+"""
+Offline benchmarks for the scrapers.
+
+    python benchmark.py names [--elo-file FILE] [--queries N] [--seed N]
+    python benchmark.py parse [PAGE ... | --archive] [--repeat N]
+    python benchmark.py dedup [--records N]
+    python benchmark.py pipeline [--betclic-pages ... --player-pages ... | --archive] [--save-baseline | --baseline FILE]
+
+`names` compares the previous difflib lookup with the NameMatcher engine on
+the ATP ELO player list: labelled variants of real names ("Zverev A.",
+accents dropped, typos, swapped order...) plus names absent from the list.
+
+`parse` times each Betclic page parser backend on saved pages (by default
+the fixture pages of fixtures/betclic/, or the most recent pages of the
+Betclic page archive with --archive) and checks that they all find the
+same scripts and cards as the BeautifulSoup reference.
+
+`dedup` compares the previous enhanced_deduplication with the matchId-first
+engine on a synthetic set of JSON/HTML records with known duplicates.
+
+`pipeline` runs every extraction stage (Betclic page parse, JSON and HTML
+extraction, deduplication, player table parsing) over a corpus of saved
+pages and reports per-stage timings, pages/s, matches/s and peak memory.
+The default corpus is the fixture pages committed in fixtures/ and the
+default baseline fixtures/benchmark_baseline.json was recorded on them;
+against the baseline it exits with an error when a stage got slower than
+the tolerance, so parser regressions are caught before deploy.
+"""
+import argparse
+import asyncio
+import csv
+import difflib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import betclic_scraper_render_optimized as betclic
+from page_archive import PageArchive
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_BASELINE = os.path.join(FIXTURES_DIR, "benchmark_baseline.json")
+
+
+def load_elo_names(path=None):
+    """Player names from a file (ELO cache JSON, CSV with a `player` column or one name per line), the local ELO cache or Supabase"""
+    path = path or (betclic.ELO_CACHE_PATH if os.path.exists(betclic.ELO_CACHE_PATH) else None)
+    if path is None:
+        async def load():
+            async with betclic.supabase:
+                return await betclic.load_elo_players()
+        players = asyncio.run(load())
+        return [p["player"] for p in players if p.get("player")]
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+            players = data.get("players", []) if isinstance(data, dict) else data
+            return [p["player"] if isinstance(p, dict) else p for p in players if p]
+        if path.endswith(".csv"):
+            return [row["player"] for row in csv.DictReader(f) if row.get("player")]
+        return [line.strip() for line in f if line.strip()]
+
+
+def _typo(token, rng):
+    if len(token) < 4:
+        return token
+    i = rng.randrange(1, len(token) - 1)
+    if rng.random() < 0.5:
+        return token[:i] + token[i + 1] + token[i] + token[i + 2:]
+    return token[:i] + token[i + 1:]
+
+
+VARIANTS = {
+    "last_initial": lambda parts, rng: f"{' '.join(parts[1:])} {parts[0][0]}.",
+    "initial_last": lambda parts, rng: f"{parts[0][0]}. {' '.join(parts[1:])}",
+    "swapped": lambda parts, rng: f"{' '.join(parts[1:])} {parts[0]}",
+    "folded_hyphen": lambda parts, rng: "-".join(parts).encode("ascii", "ignore").decode("ascii"),
+    "typo": lambda parts, rng: " ".join(_typo(p, rng) if len(p) == max(map(len, parts)) else p for p in parts),
+    "upper_last": lambda parts, rng: f"{' '.join(parts[1:]).upper()} {parts[0]}",
+}
+
+
+def make_name_queries(names, count, seed):
+    """Return [(query, expected_name_or_None, kind)]: variants of real names and unknown names"""
+    rng = random.Random(seed)
+    multi_token = [n for n in names if len(n.split()) >= 2]
+    known = {betclic.normalize_name(n) for n in names}
+    queries = []
+    for _ in range(count):
+        name = rng.choice(multi_token)
+        kind = rng.choice(list(VARIANTS))
+        queries.append((VARIANTS[kind](name.split(), rng), name, kind))
+
+    # Prénom d'un joueur + nom d'un autre : absent de la base, doit rester sans correspondance
+    while len(queries) < count + count // 4:
+        first, last = rng.sample(multi_token, 2)
+        query = f"{first.split()[0]} {last.split()[-1]}"
+        if betclic.normalize_name(query) not in known:
+            queries.append((query, None, "unknown"))
+    return queries
+
+
+def difflib_lookup(names):
+    """The lookup used before the NameMatcher engine: difflib over every normalized name"""
+    by_normalized = {betclic.normalize_name(n): n for n in names}
+    normalized_names = list(by_normalized)
+
+    def lookup(query):
+        normalized = betclic.normalize_name(query)
+        if normalized in by_normalized:
+            return by_normalized[normalized]
+        matches = difflib.get_close_matches(normalized, normalized_names, n=1, cutoff=0.8)
+        return by_normalized[matches[0]] if matches else None
+    return lookup
+
+
+def score_lookup(lookup, queries):
+    stats = {"correct": 0, "missed": 0, "wrong": 0, "false_positive": 0, "unknown": 0}
+    start = time.perf_counter()
+    for query, expected, _ in queries:
+        found = lookup(query)
+        if expected is None:
+            stats["unknown"] += 1
+            stats["false_positive"] += found is not None
+        elif found is None:
+            stats["missed"] += 1
+        elif found == expected:
+            stats["correct"] += 1
+        else:
+            stats["wrong"] += 1
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def bench_names(args):
+    names = load_elo_names(args.elo_file)
+    if len(names) < 2:
+        logging.error("Not enough ELO player names to benchmark")
+        return 1
+    queries = make_name_queries(names, args.queries, args.seed)
+    positives = sum(1 for _, expected, _ in queries if expected is not None)
+    print(f"{len(names)} ELO names, {positives} variant queries, {len(queries) - positives} unknown names")
+
+    start = time.perf_counter()
+    resolver = betclic.NameResolver(names)
+    build_seconds = time.perf_counter() - start
+
+    candidates = {
+        "difflib": difflib_lookup(names),
+        # Le mémo est vidé à chaque requête pour mesurer le moteur et non le cache
+        "name_matcher": lambda q: (resolver._memo.clear(), resolver.resolve(q)[0])[1],
+    }
+    print(f"name_matcher index built in {build_seconds * 1000:.0f} ms")
+    print(f"{'matcher':<14}{'top-1':>8}{'missed':>8}{'wrong':>8}{'false +':>9}{'queries/s':>11}")
+    for label, lookup in candidates.items():
+        s = score_lookup(lookup, queries)
+        print(f"{label:<14}{s['correct'] / positives:>8.1%}{s['missed'] / positives:>8.1%}"
+              f"{s['wrong'] / positives:>8.1%}{s['false_positive'] / max(s['unknown'], 1):>9.1%}"
+              f"{len(queries) / s['seconds']:>11.0f}")
+    return 0
+
+
+def load_pages(kind, paths, limit, archive=False):
+    """
+    [(label, url, page_bytes)] from the given files, else the most recent
+    distinct archived pages of `kind` with `archive`, else the fixture pages
+    of `kind` (fixtures/<kind>/*.html)
+    """
+    if not paths and not archive:
+        fixtures_dir = os.path.join(FIXTURES_DIR, kind)
+        paths = sorted(os.path.join(fixtures_dir, name) for name in os.listdir(fixtures_dir) if name.endswith(".html")) \
+            if os.path.isdir(fixtures_dir) else []
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, "rb") as f:
+                pages.append((os.path.basename(path), path, f.read()))
+        return pages
+    archive = PageArchive(kind)
+    latest = {}
+    for entry in archive.entries():
+        latest[entry["sha256"]] = entry
+    recent = sorted(latest.values(), key=lambda entry: entry["fetched_at"])[-limit:]
+    return [(entry["sha256"][:12], entry["url"], archive.read(entry["sha256"])) for entry in recent]
+
+
+def load_betclic_pages(paths, limit, archive=False):
+    """[(label, page_content)] of Betclic pages, see load_pages"""
+    return [(label, page.decode("utf-8")) for label, _, page in load_pages("betclic", paths, limit, archive)]
+
+
+def bench_parse(args):
+    pages = load_betclic_pages(args.pages, args.limit, args.archive)
+    if not pages:
+        logging.error("No saved page to parse (pass paths as arguments, or archive pages with a scraper run and use --archive)")
+        return 1
+
+    parsers = [p for p in betclic.PAGE_PARSERS if p != "selectolax" or betclic.LexborHTMLParser is not None]
+    print(f"{'page':<28}{'parser':<13}{'ms/page':>9}{'cards':>7}{'scripts':>9}{'speedup':>9}  same as html.parser")
+    for label, page_content in pages:
+        results = {}
+        for parser in parsers:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                parsed = betclic.parse_betclic_page(page_content, parser)
+            results[parser] = (parsed, (time.perf_counter() - start) / args.repeat)
+
+        reference, reference_seconds = results["html.parser"]
+        for parser, ((scripts, cards), seconds) in results.items():
+            same = (scripts, cards) == reference
+            print(f"{label[:27]:<28}{parser:<13}{seconds * 1000:>9.1f}{len(cards):>7}{len(scripts):>9}"
+                  f"{reference_seconds / seconds:>8.1f}x  {'yes' if same else 'NO'}")
+    return 0
+
+
+def legacy_deduplication(matches_list):
+    """The deduplication used before deduplicate_matches, kept as the reference"""
+    def create_match_key(match):
+        def clean_player_name(name):
+            name = re.sub(r'\(.*?\)', '', name)
+            name = re.sub(r'\d+', '', name)
+            return name.strip().lower()
+        players = tuple(sorted([clean_player_name(betclic.normalize_name(match.get("player1", ""))),
+                                clean_player_name(betclic.normalize_name(match.get("player2", "")))]))
+        date_str = str(match.get("date", "")).lower().strip()
+        heure_str = str(match.get("heure", "")).strip()
+        hour = ""
+        if ":" in heure_str:
+            hour = heure_str.split(":")[0]
+        elif heure_str and heure_str.isdigit():
+            hour = heure_str[:2] if len(heure_str) >= 2 else heure_str
+        return f"{players}|{date_str}|{hour}"
+
+    unique_matches = []
+    seen_match_keys, seen_urls, seen_player_pairs = set(), set(), set()
+    for match in matches_list:
+        match_key = create_match_key(match)
+        match_url = match.get("match_url", "")
+        player_pair = tuple(sorted([betclic.normalize_name(match.get("player1", "")),
+                                    betclic.normalize_name(match.get("player2", ""))]))
+        if match_key in seen_match_keys or (match_url and match_url in seen_urls):
+            continue
+        if player_pair in seen_player_pairs and match.get("date", ""):
+            continue
+        seen_match_keys.add(match_key)
+        if match_url:
+            seen_urls.add(match_url)
+        seen_player_pairs.add(player_pair)
+        unique_matches.append(match)
+    return unique_matches
+
+
+def make_dedup_records(count, seed):
+    """
+    Synthetic scraped records: every match appears as a JSON record and an
+    HTML card (sometimes twice), and some players meet again in another
+    tournament. Returns (records, expected number of distinct matches).
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "ro", "mi", "del", "van", "to", "ri", "sen", "lo", "ba", "nor", "el"]
+    players = sorted({f"{rng.choice(syllables).title()}{rng.choice(syllables)} "
+                      f"{rng.choice(syllables).title()}{rng.choice(syllables)}{rng.choice(syllables)}"
+                      for _ in range(600)})
+    tournaments = [f"ATP Event {i}" for i in range(30)]
+    records = []
+    match_id = 1000000
+    pairs = []
+    while len(records) < count:
+        match_id += 1
+        if pairs and rng.random() < 0.1:
+            player1, player2 = rng.choice(pairs)  # revanche dans un autre tournoi
+        else:
+            player1, player2 = rng.sample(players, 2)
+            pairs.append((player1, player2))
+        tournoi = rng.choice(tournaments)
+        hour = f"{rng.randint(10, 22)}:{rng.choice(['00', '30'])}"
+        slug = lambda name: name.lower().replace(" ", "-")
+        json_record = {
+            "date": "18/10", "heure": hour, "tournoi": tournoi, "tour": "",
+            "player1": player1, "player2": player2,
+            "match_url": f"https://www.betclic.fr/tennis-stennis/{slug(tournoi)}/{slug(player1)}-{slug(player2)}-m{match_id}",
+            "scraped_date": "2026-10-17", "scraped_time": "07:00:00",
+        }
+        html_record = {
+            "date": "Dem.", "heure": hour, "tournoi": tournoi.title(), "tour": "",
+            "player1": player1, "player2": player2,
+            "match_url": f"https://www.betclic.fr/tennis-stennis/{slug(tournoi)}-c{rng.randint(1, 99)}/{slug(player1)}-{slug(player2)}-m{match_id}",
+            "scraped_date": "2026-10-17", "scraped_time": "07:00:00",
+        }
+        records.append(json_record)
+        records.extend([html_record] * (2 if rng.random() < 0.2 else 1))
+    rng.shuffle(records)
+    records = records[:count]
+    expected = len({betclic.match_id_from_url(record["match_url"]) for record in records})
+    return records, expected
+
+
+def bench_dedup(args):
+    records, expected = make_dedup_records(args.records, args.seed)
+    print(f"{len(records)} records, {expected} distinct matches")
+    print(f"{'engine':<22}{'ms':>8}{'records/s':>11}{'kept':>7}{'lost':>7}{'duplicates left':>17}")
+    logging.disable(logging.INFO)
+    try:
+        for label, deduplicate in (("enhanced_deduplication", legacy_deduplication),
+                                   ("deduplicate_matches", betclic.deduplicate_matches)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                unique = deduplicate(records)
+            seconds = (time.perf_counter() - start) / args.repeat
+            kept_ids = [betclic.match_id_from_url(record["match_url"]) for record in unique]
+            lost = expected - len(set(kept_ids))
+            print(f"{label:<22}{seconds * 1000:>8.1f}{len(records) / seconds:>11.0f}{len(unique):>7}{lost:>7}"
+                  f"{len(kept_ids) - len(set(kept_ids)):>17}")
+    finally:
+        logging.disable(logging.NOTSET)
+    return 0
+
+
+def run_pipeline_stages(betclic_pages, player_pages, player_stats):
+    """Run every stage once. Returns ({stage: seconds}, {stage: items produced})"""
+    seconds = {}
+    items = {}
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds[stage] = seconds.get(stage, 0.0) + time.perf_counter() - start
+        return result
+
+    for _, _, page_content in betclic_pages:
+        scripts, cards = timed("betclic.parse", betclic.parse_betclic_page, page_content)
+        json_matches = timed("betclic.extract_json", lambda: list(betclic.extract_json_matches(scripts)))
+        html_matches = timed("betclic.extract_html", betclic.extract_html_matches, cards)
+        unique = timed("betclic.dedup", betclic.deduplicate_matches, json_matches + html_matches)
+        items["betclic.extract_json"] = items.get("betclic.extract_json", 0) + len(json_matches)
+        items["betclic.extract_html"] = items.get("betclic.extract_html", 0) + len(html_matches)
+        items["betclic.dedup"] = items.get("betclic.dedup", 0) + len(unique)
+    for _, url, page_bytes in player_pages:
+        parsed = timed("player.parse", player_stats.parse_player_page, page_bytes, url)
+        items["player.parse"] = items.get("player.parse", 0) + len(parsed)
+    return seconds, items
+
+
+def measure_peak_memory(betclic_pages, player_pages, player_stats):
+    """Peak traced memory (bytes) of each stage, measured in a separate pass since tracing slows everything down"""
+    peaks = {}
+
+    def traced(stage, fn, *args):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn(*args)
+        peaks[stage] = max(peaks.get(stage, 0), tracemalloc.get_traced_memory()[1] - before)
+        return result
+
+    tracemalloc.start()
+    try:
+        for _, _, page_content in betclic_pages:
+            scripts, cards = traced("betclic.parse", betclic.parse_betclic_page, page_content)
+            json_matches = traced("betclic.extract_json", lambda: list(betclic.extract_json_matches(scripts)))
+            html_matches = traced("betclic.extract_html", betclic.extract_html_matches, cards)
+            traced("betclic.dedup", betclic.deduplicate_matches, json_matches + html_matches)
+        for _, url, page_bytes in player_pages:
+            traced("player.parse", player_stats.parse_player_page, page_bytes, url)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print the change of every stage against the baseline. Returns the stages slower than the tolerance"""
+    regressions = []
+    if baseline.get("corpus") != results["corpus"]:
+        print("warning: the baseline was recorded on a different corpus, timings may not be comparable")
+    print(f"{'stage':<24}{'baseline ms':>13}{'now ms':>9}{'change':>9}")
+    for stage, now in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        change = now["ms_per_page"] / before["ms_per_page"] - 1 if before["ms_per_page"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(stage)
+            flag = "  REGRESSION"
+        print(f"{stage:<24}{before['ms_per_page']:>13.2f}{now['ms_per_page']:>9.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def bench_pipeline(args):
+    import player_stats_scraper as player_stats
+
+    betclic_pages = [(label, url, page.decode("utf-8"))
+                     for label, url, page in load_pages("betclic", args.betclic_pages, args.limit, args.archive)]
+    player_pages = load_pages("tennis_abstract", args.player_pages, args.limit, args.archive)
+    if not betclic_pages and not player_pages:
+        logging.error("No saved page to benchmark (pass --betclic-pages/--player-pages, or archive pages with a scraper run and use --archive)")
+        return 1
+
+    # Les logs INFO des extracteurs fausseraient les mesures
+    logging.disable(logging.INFO)
+    try:
+        run_pipeline_stages(betclic_pages, player_pages, player_stats)  # échauffement
+        totals = {}
+        for _ in range(args.repeat):
+            seconds, items = run_pipeline_stages(betclic_pages, player_pages, player_stats)
+            for stage, value in seconds.items():
+                totals[stage] = totals.get(stage, 0.0) + value
+        peaks = measure_peak_memory(betclic_pages, player_pages, player_stats)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    stages = {}
+    print(f"{len(betclic_pages)} Betclic pages, {len(player_pages)} player pages, {args.repeat} runs")
+    print(f"{'stage':<24}{'ms/page':>9}{'pages/s':>9}{'items/s':>10}{'peak MB':>9}")
+    for stage, total in totals.items():
+        page_count = len(player_pages) if stage.startswith("player.") else len(betclic_pages)
+        per_run = total / args.repeat
+        stages[stage] = {
+            "ms_per_page": per_run / page_count * 1000,
+            "pages_per_s": page_count / per_run if per_run else 0.0,
+            "items_per_s": items.get(stage, 0) / per_run if per_run and stage in items else None,
+            "peak_mb": peaks.get(stage, 0) / 1e6,
+        }
+        s = stages[stage]
+        items_per_s = f"{s['items_per_s']:>10.0f}" if s["items_per_s"] is not None else f"{'-':>10}"
+        print(f"{stage:<24}{s['ms_per_page']:>9.2f}{s['pages_per_s']:>9.1f}{items_per_s}{s['peak_mb']:>9.1f}")
+
+    betclic_seconds = sum(total for stage, total in totals.items() if stage.startswith("betclic.")) / args.repeat
+    if betclic_pages and betclic_seconds:
+        print(f"Betclic end to end: {len(betclic_pages) / betclic_seconds:.1f} pages/s, "
+              f"{items.get('betclic.dedup', 0) / betclic_seconds:.0f} unique matches/s")
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "corpus": sorted(label for label, _, _ in betclic_pages + player_pages),
+        "stages": stages,
+    }
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scrapers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    names = subparsers.add_parser("names", help="Player name matching: difflib vs NameMatcher")
+    names.add_argument("--elo-file", help="ELO players (cache JSON, CSV with a player column or one name per line); "
+                                          "defaults to the local ELO cache, then Supabase")
+    names.add_argument("--queries", type=int, default=2000, help="Number of variant queries (default: 2000)")
+    names.add_argument("--seed", type=int, default=42)
+    names.set_defaults(func=bench_names)
+
+    parse = subparsers.add_parser("parse", help="Betclic page parser backends on saved pages")
+    parse.add_argument("pages", nargs="*", help="Saved Betclic pages (default: fixtures/betclic/)")
+    parse.add_argument("--archive", action="store_true", help="Use the archived pages instead of the fixtures")
+    parse.add_argument("--limit", type=int, default=5, help="Archived pages to use with --archive (default: 5)")
+    parse.add_argument("--repeat", type=int, default=3, help="Parses per page and backend (default: 3)")
+    parse.set_defaults(func=bench_parse)
+
+    dedup = subparsers.add_parser("dedup", help="Deduplication engines on synthetic JSON/HTML records")
+    dedup.add_argument("--records", type=int, default=10000, help="Number of synthetic records (default: 10000)")
+    dedup.add_argument("--repeat", type=int, default=5)
+    dedup.add_argument("--seed", type=int, default=42)
+    dedup.set_defaults(func=bench_dedup)
+
+    pipeline = subparsers.add_parser("pipeline", help="Every extraction stage over saved pages, against a baseline")
+    pipeline.add_argument("--betclic-pages", nargs="*", help="Saved Betclic pages (default: fixtures/betclic/)")
+    pipeline.add_argument("--player-pages", nargs="*", help="Saved Tennis Abstract player pages (default: fixtures/tennis_abstract/)")
+    pipeline.add_argument("--archive", action="store_true", help="Use the archived pages instead of the fixtures")
+    pipeline.add_argument("--limit", type=int, default=20, help="Archived pages of each kind to use with --archive (default: 20)")
+    pipeline.add_argument("--repeat", type=int, default=3, help="Timed runs over the corpus (default: 3)")
+    pipeline.add_argument("--baseline", default=FIXTURE_BASELINE,
+                          help="Baseline file to compare with (default: fixtures/benchmark_baseline.json)")
+    pipeline.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    pipeline.add_argument("--tolerance", type=float, default=0.2,
+                          help="Slowdown per stage tolerated against the baseline (default: 0.2)")
+    pipeline.set_defaults(func=bench_pipeline)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,29 @@
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import time
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timezone
 import random
 import re
+import unicodedata
 import logging
-import difflib
-import httpx
 from typing import List, Dict, Any
 import json
+import asyncio
+from collections import namedtuple
+from functools import lru_cache
+import httpx
+import lxml.html
+from supabase_client import AsyncSupabaseClient, SupabaseError
+from name_matching import NameMatcher
+from page_archive import PageArchive
+from metrics import RunMetrics
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # backend optionnel, lxml prend le relais
+    LexborHTMLParser = None
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,98 +33,222 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SCRAPERAPI_KEY = os.getenv("SCRAPERAPI_KEY", "aae0279e8feccdcfb5b40c85fdd65a66")
 
-# MinimalSupabaseClient
-class MinimalSupabaseClient:
-    def __init__(self, supabase_url: str, supabase_key: str):
-        self.supabase_url = supabase_url.rstrip('/')
-        self.supabase_key = supabase_key
-        self.base_headers = {
-            "apikey": self.supabase_key,
-            "Authorization": f"Bearer {self.supabase_key}",
-            "Content-Type": "application/json",
-        }
-        self.client = httpx.Client(headers=self.base_headers, timeout=30.0)
-        self.current_table = None
-
-    def table(self, table_name: str):
-        self.current_table = table_name
-        return self
-
-    def select(self, columns: str = "*", params: dict = None):
-        if not self.current_table:
-            logging.error("Table not set for select operation.")
-            return {"data": [], "error": "Table not set", "count": None}
-
-        url = f"{self.supabase_url}/rest/v1/{self.current_table}?select={columns}"
-
-        try:
-            response = self.client.get(url, params=params if params else {})
-            response.raise_for_status()
-            count = None
-            content_range = response.headers.get("content-range")
-            if content_range and "/" in content_range:
-                count_str = content_range.split("/")[-1]
-                if count_str != "*":
-                    count = int(count_str)
-            return {"data": response.json(), "error": None, "count": count}
-        except httpx.HTTPStatusError as e:
-            logging.error(f"HTTP error during select on {self.current_table}: {e.response.text if e.response else str(e)}")
-            return {"data": [], "error": str(e), "count": None}
-        except Exception as e:
-            logging.error(f"Generic error during select on {self.current_table}: {e}")
-            return {"data": [], "error": str(e), "count": None}
-
-    def insert(self, data: list, upsert: bool = False):
-        if not self.current_table:
-            logging.error("Table not set for insert operation.")
-            return {"data": [], "error": "Table not set"}
+# Client Supabase async partagé avec player_stats_scraper.py
+supabase = AsyncSupabaseClient(SUPABASE_URL or "", SUPABASE_KEY or "", max_concurrency=int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8")))
 
-        url = f"{self.supabase_url}/rest/v1/{self.current_table}"
+# Pages Betclic archivées compressées (voir page_archive.py), écrites en tâche de fond
+page_archive = PageArchive("betclic")
 
-        custom_headers = self.base_headers.copy()
-        custom_headers["Prefer"] = "return=representation"
-        if upsert:
-            custom_headers["Prefer"] += ",resolution=merge-duplicates"
-            logging.info(f"Performing upsert on {self.current_table} with Prefer: {custom_headers['Prefer']}")
-
-        try:
-            response = self.client.post(url, json=data, headers=custom_headers)
-            response.raise_for_status()
-            return {"data": response.json(), "error": None}
-        except httpx.HTTPStatusError as e:
-            logging.error(f"HTTP error during insert on {self.current_table}: {e.response.text if e.response else str(e)}")
-            return {"data": [], "error": str(e)}
-        except Exception as e:
-            logging.error(f"Generic error during insert on {self.current_table}: {e}")
-            return {"data": [], "error": str(e)}
-
-    def delete_rows(self, params: dict = None):
-        if not self.current_table:
-            logging.error("Table not set for delete operation.")
-            return {"data": [], "error": "Table not set"}
-
-        url = f"{self.supabase_url}/rest/v1/{self.current_table}"
-
-        custom_headers = self.base_headers.copy()
-        custom_headers["Prefer"] = "return=representation"
-
-        try:
-            response = self.client.delete(url, params=params if params else {}, headers=custom_headers)
-            response.raise_for_status()
-            return {"data": response.json() if response.status_code != 204 else [], "error": None}
-        except httpx.HTTPStatusError as e:
-            logging.error(f"HTTP error during delete on {self.current_table}: {e.response.text if e.response else str(e)}")
-            return {"data": [], "error": str(e)}
-        except Exception as e:
-            logging.error(f"Generic error during delete on {self.current_table}: {e}")
-            return {"data": [], "error": str(e)}
-
-# Initialize Supabase client
-supabase = MinimalSupabaseClient(supabase_url=SUPABASE_URL, supabase_key=SUPABASE_KEY)
+# Métriques du run (temps par étape, octets, crédits ScraperAPI, latences Supabase), voir metrics.py
+metrics = RunMetrics("betclic")
+metrics.attach_client("supabase", supabase)
 
 # ScraperAPI configuration
 SCRAPERAPI_ENDPOINT = "http://api.scraperapi.com"
+SCRAPERAPI_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+
+# Budgets de défilement essayés du plus petit au plus grand (scroll_count, wait en ms, pause en ms)
+SCROLL_BUDGETS = [
+    (100, 45000, 500),
+    (150, 50000, 500),
+    (200, 60000, 500),
+    (250, 60000, 500),
+    (325, 70000, 750),
+    (400, 80000, 1000),
+]
+SCROLL_TARGET_CARDS = int(os.getenv("SCROLL_TARGET_CARDS", "100"))
+SCROLL_CONFIDENCE = float(os.getenv("SCROLL_CONFIDENCE", "0.8"))
+SCROLL_HISTORY_PATH = os.getenv("SCROLL_HISTORY_PATH", ".cache/scroll_history.json")
+SCROLL_HISTORY_SIZE = 500
+# Historique partagé dans Supabase : le disque des cron jobs Render repart vide à chaque run
+SCROLL_HISTORY_TABLE = os.getenv("SCROLL_HISTORY_TABLE", "scroll_history")
+SCROLL_HISTORY_COLUMNS = "url,env,at,weekday,slot,scroll_count,wait,scroll_pause_time,cards"
+# Un budget plus petit est essayé quand les succès récents laissent au moins cette marge de cartes
+SCROLL_EXPLORE_MARGIN = 1.25
+# Crédits ScraperAPI facturés par requête render=true + premium=true
+SCRAPERAPI_RENDER_CREDITS = int(os.getenv("SCRAPERAPI_RENDER_CREDITS", "25"))
+# Crédits d'une requête premium=true sans rendu
+SCRAPERAPI_PREMIUM_CREDITS = int(os.getenv("SCRAPERAPI_PREMIUM_CREDITS", "10"))
+
+class ScrollBudgetController:
+    """
+    Picks the smallest scroll budget expected to load SCROLL_TARGET_CARDS cards.
+
+    Every attempt (budget, time slot, cards loaded) is kept in the
+    SCROLL_HISTORY_TABLE Supabase table, or in a local JSON history when the
+    table is unavailable. A budget's success probability is estimated from past attempts,
+    assuming more scrolling never loads fewer cards: a success with a smaller
+    or equal budget and a failure with a larger or equal budget both count,
+    weighted by how close their weekday and time of day are to now. Budgets
+    without evidence are explored one rung at a time, downwards when the
+    recent successes loaded enough cards per scroll to need fewer scrolls.
+    """
+    def __init__(self, url, env_type, default_scroll_count, path=SCROLL_HISTORY_PATH):
+        self.url = url
+        self.env_type = env_type
+        self.path = path
+        self.default_index = min(range(len(SCROLL_BUDGETS)),
+                                 key=lambda i: abs(SCROLL_BUDGETS[i][0] - default_scroll_count))
+        now = datetime.now()
+        self.weekday, self.slot = now.weekday(), now.hour // 3
+        self.remote = bool(SCROLL_HISTORY_TABLE and SUPABASE_URL and SUPABASE_KEY)
+        self.history = self._load()
+
+    async def _select_remote(self):
+        async with supabase:
+            rows, _ = await supabase.select_page(SCROLL_HISTORY_TABLE, SCROLL_HISTORY_COLUMNS,
+                                                 filters={"url": f"eq.{self.url}", "env": f"eq.{self.env_type}"},
+                                                 limit=SCROLL_HISTORY_SIZE, order="at.desc")
+            return rows[::-1]
+
+    async def _insert_remote(self, record):
+        async with supabase:
+            await supabase.insert(SCROLL_HISTORY_TABLE, [record])
+
+    def _load(self):
+        if self.remote:
+            try:
+                return asyncio.run(self._select_remote())
+            except SupabaseError as e:
+                # Table absente : historique local (voir le README pour la créer)
+                logging.warning(f"Scroll history table '{SCROLL_HISTORY_TABLE}' unavailable ({e.message}), using {self.path}")
+                self.remote = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                history = json.load(f)
+            return history if isinstance(history, list) else []
+        except (OSError, ValueError):
+            return []
 
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.history[-SCROLL_HISTORY_SIZE:], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not write scroll history {self.path}: {e}")
+
+    def _weight(self, record):
+        if record.get("url") != self.url or record.get("env") != self.env_type:
+            return 0.0
+        same_slot = record.get("slot") == self.slot
+        same_day = record.get("weekday") == self.weekday
+        return 1.0 if same_slot and same_day else 0.5 if same_slot else 0.25 if same_day else 0.1
+
+    def _evidence(self, index):
+        """Weighted (successes, failures) that tell something about SCROLL_BUDGETS[index]"""
+        scroll_count = SCROLL_BUDGETS[index][0]
+        successes = failures = 0.0
+        for record in self.history:
+            weight = self._weight(record)
+            if not weight:
+                continue
+            if record["cards"] >= SCROLL_TARGET_CARDS and record["scroll_count"] <= scroll_count:
+                successes += weight
+            elif record["cards"] < SCROLL_TARGET_CARDS and record["scroll_count"] >= scroll_count:
+                failures += weight
+        return successes, failures
+
+    def success_probability(self, index):
+        """Estimated probability that SCROLL_BUDGETS[index] reaches the target, or None without data"""
+        successes, failures = self._evidence(index)
+        if successes + failures == 0:
+            return None
+        # Lissage de Laplace pour ne pas conclure sur un seul run
+        return (successes + 1) / (successes + failures + 2)
+
+    def estimated_index(self):
+        """
+        Smallest budget that the recent successes suggest is enough, from their
+        cards per scroll with a SCROLL_EXPLORE_MARGIN margin, or None without success
+        """
+        successes = [record for record in self.history
+                     if self._weight(record) and record["cards"] >= SCROLL_TARGET_CARDS][-5:]
+        if not successes:
+            return None
+        # Le succès le moins productif fixe le besoin, par prudence
+        needed = max(record["scroll_count"] * SCROLL_TARGET_CARDS * SCROLL_EXPLORE_MARGIN / record["cards"]
+                     for record in successes)
+        return next((i for i, budget in enumerate(SCROLL_BUDGETS) if budget[0] >= needed), len(SCROLL_BUDGETS) - 1)
+
+    def choose(self, above=-1):
+        """Index of the smallest budget above `above` expected to reach the target"""
+        for index in range(above + 1, len(SCROLL_BUDGETS)):
+            probability = self.success_probability(index)
+            if probability is None:
+                if above >= 0:
+                    # Après un échec : le budget suivant
+                    return index
+                # Pas de preuve pour ce budget : le plus petit budget déjà sûr, sinon le budget historique du script
+                chosen = next((i for i in range(index + 1, len(SCROLL_BUDGETS))
+                               if (self.success_probability(i) or 0) >= SCROLL_CONFIDENCE),
+                              max(index, self.default_index))
+                break
+            if probability >= SCROLL_CONFIDENCE:
+                chosen = index
+                break
+        else:
+            return len(SCROLL_BUDGETS) - 1 if above < len(SCROLL_BUDGETS) - 1 else None
+
+        # Exploration : un cran plus bas, s'il n'a jamais échoué et que les cartes par défilement
+        # des succès récents montrent qu'il devrait suffire
+        lower = chosen - 1
+        if above < 0 and lower >= 0 and not self._evidence(lower)[1]:
+            estimated = self.estimated_index()
+            if estimated is not None and estimated <= lower:
+                return lower
+        return chosen
+
+    def expected_cost(self, index, retries):
+        """Expected (ScraperAPI credits, seconds) of a run starting at this budget and escalating on failure"""
+        credits = seconds = 0.0
+        reach = 1.0
+        for _ in range(retries):
+            if index is None:
+                break
+            scroll_count, wait, pause = SCROLL_BUDGETS[index]
+            credits += reach * SCRAPERAPI_RENDER_CREDITS
+            seconds += reach * (wait / 1000 + scroll_count * pause / 1000)
+            probability = self.success_probability(index)
+            reach *= 1 - (probability if probability is not None else 0.5)
+            index = self.choose(above=index)
+        return credits, seconds
+
+    def record(self, index, cards):
+        scroll_count, wait, pause = SCROLL_BUDGETS[index]
+        record = {
+            "url": self.url, "env": self.env_type, "at": time.time(),
+            "weekday": self.weekday, "slot": self.slot,
+            "scroll_count": scroll_count, "wait": wait, "scroll_pause_time": pause,
+            "cards": cards,
+        }
+        self.history.append(record)
+        if self.remote:
+            try:
+                asyncio.run(self._insert_remote(record))
+                return
+            except SupabaseError as e:
+                logging.warning(f"Could not save the scroll attempt to '{SCROLL_HISTORY_TABLE}': {e.message}")
+        self._save()
+
+def record_scraperapi_attempt(url, attempt, seconds, status_code, size, credits, **details):
+    """Count one ScraperAPI attempt; only successful requests are billed"""
+    credits = credits if status_code == 200 else 0
+    metrics.add("scraperapi_requests")
+    metrics.add("scraperapi_credits", credits)
+    metrics.add("bytes_fetched", size)
+    metrics.event("scraperapi_attempts", url=url, attempt=attempt + 1, seconds=round(seconds, 3),
+                  status=status_code, bytes=size, credits=credits, **details)
+
+@metrics.timed("scraperapi_render")
 def get_scraperapi_response(url, retries=3):
     """
     Patient and frequent ScraperAPI request to maximize content loading.
@@ -135,22 +271,27 @@ def get_scraperapi_response(url, retries=3):
         'execute_script': 'window.scrollTo(0, document.body.scrollHeight);'
     }
     
+    # Budget de défilement choisi d'après l'historique des runs précédents
+    controller = ScrollBudgetController(url, env_type, default_scroll_count=200 if is_render else 250)
+    budget_index = controller.choose()
+    expected_credits, expected_seconds = controller.expected_cost(budget_index, retries)
+    probability = controller.success_probability(budget_index)
+    logging.info(f"[{env_type}] Scroll budget {SCROLL_BUDGETS[budget_index][0]} scrolls "
+                 f"(success probability {'unknown' if probability is None else f'{probability:.0%}'}), "
+                 f"expected cost {expected_credits:.0f} ScraperAPI credits, ~{expected_seconds:.0f}s")
+
+    def budget_params(index):
+        scroll_count, wait, pause = SCROLL_BUDGETS[index]
+        return {'wait': str(wait), 'scroll_count': str(scroll_count), 'scroll_pause_time': str(pause)}
+
     current_params = base_params.copy()
     current_params.update({
-        'wait': '60000',  # 60s for initial page load
         'scroll': 'true',
-        'scroll_count': '200' if is_render else '250',  # Many frequent scrolls
         'scroll_timeout': '3000',  # 3s for each scroll action
-        'scroll_pause_time': '500',  # 500ms pause between each scroll (frequent)
+        **budget_params(budget_index),
     })
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive'
-    }
+    headers = SCRAPERAPI_HEADERS
     
     # Timeout needs to be long enough for all scrolls: scroll_count * (scroll_pause_time + scroll_timeout roughly) + wait
     # Example: 200 * (0.5s + 3s) = 200 * 3.5s = 700s. This is too long.
@@ -169,8 +310,12 @@ def get_scraperapi_response(url, retries=3):
         logging.info(f"[{env_type}] Fetching {url} via ScraperAPI (attempt {attempt + 1}/{retries})")
         logging.info(f"[{env_type}] Scrolling config: wait={current_wait_log}s, scrolls={current_scroll_count_log}, scroll_timeout={current_scroll_timeout_log}ms, scroll_pause={current_scroll_pause_time_log}ms, overall_timeout={timeout}s")
         
+        attempt_start = time.perf_counter()
         try:
             response = requests.get(SCRAPERAPI_ENDPOINT, params=current_params, headers=headers, timeout=timeout)
+            record_scraperapi_attempt(url, attempt, time.perf_counter() - attempt_start, response.status_code,
+                                      len(response.content), SCRAPERAPI_RENDER_CREDITS,
+                                      scroll_count=int(current_params['scroll_count']))
             
             if response.status_code == 200:
                 content = response.text
@@ -179,17 +324,19 @@ def get_scraperapi_response(url, retries=3):
                 else:
                     if 'sports-events-event-card' in content:
                         card_count = content.count('sports-events-event-card')
+                        metrics.add("cards_found", card_count)
                         logging.info(f"[{env_type}] Success! Content: {len(content)} chars, Raw HTML Cards: {card_count}")
+                        controller.record(budget_index, card_count)
                         
-                        # Validation: Aim for at least 100 raw HTML cards
-                        if card_count < 100: 
-                            logging.warning(f"[{env_type}] Only {card_count} raw HTML cards found (target >100) - indicates incomplete load.")
-                            if attempt < retries - 1:
-                                logging.info(f"[{env_type}] Retrying with adjusted frequent scrolling...")
-                                current_params['scroll_count'] = str(int(current_params['scroll_count']) + 75) # Even more scrolls
-                                current_params['wait'] = str(int(current_params['wait']) + 10000) # Slightly longer initial wait for retry
-                                current_params['scroll_pause_time'] = str(int(current_params['scroll_pause_time']) + 250) # Slightly longer pause for retry (e.g. 500ms -> 750ms)
-                                time.sleep(10) 
+                        # Validation: Aim for at least SCROLL_TARGET_CARDS raw HTML cards
+                        if card_count < SCROLL_TARGET_CARDS:
+                            logging.warning(f"[{env_type}] Only {card_count} raw HTML cards found (target >{SCROLL_TARGET_CARDS}) - indicates incomplete load.")
+                            next_index = controller.choose(above=budget_index)
+                            if attempt < retries - 1 and next_index is not None:
+                                # Page incomplète, pas un blocage : on relance tout de suite avec le budget suivant
+                                budget_index = next_index
+                                logging.info(f"[{env_type}] Retrying with a scroll budget of {SCROLL_BUDGETS[budget_index][0]} scrolls...")
+                                current_params.update(budget_params(budget_index))
                                 continue
                         return content
                     else:
@@ -198,6 +345,7 @@ def get_scraperapi_response(url, retries=3):
                 logging.warning(f"[{env_type}] ScraperAPI status {response.status_code} (attempt {attempt + 1})")
                 
         except requests.exceptions.Timeout:
+            record_scraperapi_attempt(url, attempt, time.perf_counter() - attempt_start, None, 0, 0)
             logging.error(f"[{env_type}] ScraperAPI request timed out after {timeout}s (attempt {attempt + 1})")
         except Exception as e:
             logging.error(f"[{env_type}] Request failed: {e} (attempt {attempt + 1})")
@@ -209,105 +357,177 @@ def get_scraperapi_response(url, retries=3):
     logging.error(f"[{env_type}] Failed to fetch {url} with sufficient cards after {retries} attempts")
     return None
 
-def extract_json_matches(soup):
-    """Extract matches from JSON data in script tags"""
-    json_matches = []
-    script_tags = soup.find_all("script")
-    
-    for script in script_tags:
-        if script.string and '"matches":[' in script.string:
-            script_content = script.string
-            start_idx = script_content.find('"matches":[')
-            if start_idx != -1:
-                # Extract JSON array
-                bracket_count = 0
-                start_bracket = script_content.find('[', start_idx)
-                current_idx = start_bracket
-
-                while current_idx < len(script_content):
-                    if script_content[current_idx] == '[':
-                        bracket_count += 1
-                    elif script_content[current_idx] == ']':
-                        bracket_count -= 1
-                        if bracket_count == 0:
-                            end_idx = current_idx + 1
-                            break
-                    current_idx += 1
-
-                if bracket_count == 0:
-                    matches_json_str = script_content[start_bracket:end_idx]
+# Analyse de la page : un seul parcours du document fournit les scripts JSON et les cartes de match
+MATCHES_MARKER = '"matches":['
+EventCard = namedtuple("EventCard", ["labels", "href", "info_time"])
+
+def _has_class(class_attr, name):
+    return name in (class_attr or "").split()
+
+def _parse_page_selectolax(page_content):
+    tree = LexborHTMLParser(page_content)
+    scripts, cards = [], []
+    # Un seul sélecteur : les deux types de nœuds arrivent dans l'ordre du document
+    for node in tree.css("script, sports-events-event-card"):
+        if node.tag == "script":
+            text = node.text(deep=True)
+            if MATCHES_MARKER in text:
+                scripts.append(text)
+            continue
+        a_tag = node.css_first("a.cardEvent")
+        info_time = node.css_first("div.event_infoTime")
+        cards.append(EventCard(
+            labels=[label.text(deep=True).strip() for label in node.css("div.scoreboard_contestantLabel")],
+            href=a_tag.attributes.get("href") if a_tag is not None else None,
+            info_time=info_time.text(deep=True).strip() if info_time is not None else "",
+        ))
+    return scripts, cards
+
+def _parse_page_lxml(page_content):
+    root = lxml.html.document_fromstring(page_content, parser=lxml.html.HTMLParser(huge_tree=True))
+    scripts, cards = [], []
+    for element in root.iter("script", "sports-events-event-card"):
+        if element.tag == "script":
+            text = element.text or ""
+            if MATCHES_MARKER in text:
+                scripts.append(text)
+            continue
+        labels, href, info_time = [], None, None
+        for child in element.iter("div", "a"):
+            class_attr = child.get("class")
+            if child.tag == "a":
+                if href is None and _has_class(class_attr, "cardEvent"):
+                    href = child.get("href")
+            elif _has_class(class_attr, "scoreboard_contestantLabel"):
+                labels.append(child.text_content().strip())
+            elif info_time is None and _has_class(class_attr, "event_infoTime"):
+                info_time = child.text_content().strip()
+        cards.append(EventCard(labels=labels, href=href, info_time=info_time or ""))
+    return scripts, cards
+
+def _parse_page_html_parser(page_content):
+    # Ancien chemin BeautifulSoup, gardé comme référence
+    soup = BeautifulSoup(page_content, "html.parser")
+    scripts, cards = [], []
+    for element in soup.find_all(["script", "sports-events-event-card"]):
+        if element.name == "script":
+            if element.string and MATCHES_MARKER in element.string:
+                scripts.append(str(element.string))
+            continue
+        a_tag = element.find("a", class_="cardEvent")
+        info_time = element.find("div", class_="event_infoTime")
+        cards.append(EventCard(
+            labels=[label.text.strip() for label in element.find_all("div", class_="scoreboard_contestantLabel")],
+            href=a_tag.get("href") if a_tag is not None else None,
+            info_time=info_time.text.strip() if info_time is not None else "",
+        ))
+    return scripts, cards
+
+PAGE_PARSERS = {
+    "selectolax": _parse_page_selectolax,
+    "lxml": _parse_page_lxml,
+    "html.parser": _parse_page_html_parser,
+}
+BETCLIC_HTML_PARSER = os.getenv("BETCLIC_HTML_PARSER", "selectolax" if LexborHTMLParser is not None else "lxml")
+
+@metrics.timed("parse_page")
+def parse_betclic_page(page_content, parser=None):
+    """
+    Parse the Betclic page once.
+    Returns: (scripts, cards) - the inline script texts holding a "matches"
+    array and one EventCard per sports-events-event-card element
+    """
+    parser = parser or BETCLIC_HTML_PARSER
+    if parser == "selectolax" and LexborHTMLParser is None:
+        logging.warning("selectolax is not installed, falling back to lxml")
+        parser = "lxml"
+    return PAGE_PARSERS[parser](page_content)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def iter_json_match_data(script_content):
+    """
+    Yield the raw match objects of every "matches" array embedded in a script.
+    Each array is decoded in one pass from its offset with raw_decode, so
+    brackets inside strings are handled and several state blobs are supported.
+    """
+    pos = script_content.find(MATCHES_MARKER)
+    while pos != -1:
+        start = pos + len(MATCHES_MARKER) - 1
+        try:
+            matches_data, end = _JSON_DECODER.raw_decode(script_content, start)
+        except json.JSONDecodeError as e:
+            logging.warning(f"Failed to parse JSON matches at offset {start}: {e}")
+            end = start + 1
+        else:
+            logging.info(f"JSON: Found {len(matches_data)} matches in script data")
+            yield from (match_data for match_data in matches_data if isinstance(match_data, dict))
+        # Reprise après le tableau décodé : ses "matches" imbriqués ne sont pas relus
+        pos = script_content.find(MATCHES_MARKER, end)
+
+def _name_to_slug(name):
+    return name.lower().replace(" ", "-").replace(".", "")
+
+@metrics.timed("extract_json_matches")
+def extract_json_matches(scripts):
+    """Extract matches from the JSON data of the page's script tags, yielded one at a time"""
+    scraped_dt = datetime.now()
+    seen_urls = set()
+
+    for script_content in scripts:
+        for match_data in iter_json_match_data(script_content):
+            try:
+                match_id = match_data.get("matchId", "")
+                contestants = match_data.get("contestants", [])
+                if len(contestants) < 2:
+                    continue
+                player1 = contestants[0].get("name", "")
+                player2 = contestants[1].get("name", "")
+
+                competition = match_data.get("competition", {})
+                tournoi = competition.get("name", "")
+
+                date_str = "Unknown"
+                heure_str = "Unknown"
+                match_date_utc = match_data.get("matchDateUtc", "")
+                if match_date_utc:
                     try:
-                        matches_data = json.loads(matches_json_str)
-                        logging.info(f"JSON: Found {len(matches_data)} matches in script data")
-                        
-                        scraped_dt = datetime.now()
-                        seen_urls = set()
-                        
-                        for match_data in matches_data:
-                            try:
-                                match_id = match_data.get("matchId", "")
-                                contestants = match_data.get("contestants", [])
-                                if len(contestants) >= 2:
-                                    player1 = contestants[0].get("name", "")
-                                    player2 = contestants[1].get("name", "")
-
-                                    competition = match_data.get("competition", {})
-                                    tournoi = competition.get("name", "")
-
-                                    match_date_utc = match_data.get("matchDateUtc", "")
-                                    if match_date_utc:
-                                        try:
-                                            match_dt = datetime.fromisoformat(match_date_utc.replace('Z', '+00:00'))
-                                            date_str = match_dt.strftime("%d/%m")
-                                            heure_str = match_dt.strftime("%H:%M")
-                                        except:
-                                            date_str = "Unknown"
-                                            heure_str = "Unknown"
-                                    else:
-                                        date_str = "Unknown"
-                                        heure_str = "Unknown"
-
-                                    if player1 and player2 and match_id:
-                                        def name_to_slug(name):
-                                            return name.lower().replace(" ", "-").replace(".", "")
-
-                                        player1_slug = name_to_slug(player1)
-                                        player2_slug = name_to_slug(player2)
-                                        competition_slug = name_to_slug(tournoi) if tournoi else "unknown"
-
-                                        match_url = f"https://www.betclic.fr/tennis-stennis/{competition_slug}/{player1_slug}-{player2_slug}-m{match_id}"
-
-                                        if match_url not in seen_urls:
-                                            seen_urls.add(match_url)
-
-                                            match_info = {
-                                                "date": date_str,
-                                                "heure": heure_str,
-                                                "tournoi": tournoi,
-                                                "tour": "",
-                                                "player1": player1,
-                                                "player2": player2,
-                                                "scraped_date": scraped_dt.strftime("%Y-%m-%d"),
-                                                "scraped_time": scraped_dt.strftime("%H:%M:%S"),
-                                                "match_url": match_url
-                                            }
-
-                                            json_matches.append(match_info)
-
-                            except Exception as e:
-                                logging.warning(f"Error processing JSON match: {e}")
-                                continue
-                        break
-                    except json.JSONDecodeError as e:
-                        logging.warning(f"Failed to parse JSON matches: {e}")
-                        continue
-    
-    return json_matches
+                        match_dt = datetime.fromisoformat(match_date_utc.replace('Z', '+00:00'))
+                        date_str = match_dt.strftime("%d/%m")
+                        heure_str = match_dt.strftime("%H:%M")
+                    except (ValueError, AttributeError):
+                        pass
+
+                if not (player1 and player2 and match_id):
+                    continue
+
+                competition_slug = _name_to_slug(tournoi) if tournoi else "unknown"
+                match_url = f"https://www.betclic.fr/tennis-stennis/{competition_slug}/{_name_to_slug(player1)}-{_name_to_slug(player2)}-m{match_id}"
+                if match_url in seen_urls:
+                    continue
+                seen_urls.add(match_url)
+
+                yield {
+                    "date": date_str,
+                    "heure": heure_str,
+                    "tournoi": tournoi,
+                    "tour": "",
+                    "player1": player1,
+                    "player2": player2,
+                    "scraped_date": scraped_dt.strftime("%Y-%m-%d"),
+                    "scraped_time": scraped_dt.strftime("%H:%M:%S"),
+                    "match_url": match_url,
+                    "source": "json",
+                }
+
+            except Exception as e:
+                logging.warning(f"Error processing JSON match: {e}")
+                continue
 
-def extract_html_matches(soup):
-    """Extract matches from HTML sports-events-event-card elements"""
+@metrics.timed("extract_html_matches")
+def extract_html_matches(match_cards):
+    """Extract matches from the EventCards of the sports-events-event-card elements"""
     html_matches = []
-    match_cards = soup.find_all("sports-events-event-card")
     logging.info(f"HTML: Found {len(match_cards)} match cards")
     
     scraped_dt = datetime.now()
@@ -321,15 +541,15 @@ def extract_html_matches(soup):
             current_tour = ""
 
             # Extract player names
-            players = card.find_all("div", class_="scoreboard_contestantLabel")
-            player1 = players[0].text.strip() if len(players) > 0 else ""
-            player2 = players[1].text.strip() if len(players) > 1 else ""
+            players = card.labels
+            player1 = players[0] if len(players) > 0 else ""
+            player2 = players[1] if len(players) > 1 else ""
 
             # Extract match URL
-            a_tag = card.find("a", class_="cardEvent")
+            href = card.href
             match_url = ""
-            if a_tag and "href" in a_tag.attrs:
-                match_url = "https://www.betclic.fr" + a_tag["href"]
+            if href:
+                match_url = "https://www.betclic.fr" + href
 
             if not match_url or match_url in seen_urls:
                 continue
@@ -337,8 +557,8 @@ def extract_html_matches(soup):
 
             # Extract full player names from URL
             player1_full, player2_full = player1, player2
-            if a_tag and "href" in a_tag.attrs:
-                match_obj = re.search(r'/([a-z0-9\-]+)-m\d+$', a_tag["href"])
+            if href:
+                match_obj = re.search(r'/([a-z0-9\-]+)-m\d+$', href)
                 if match_obj:
                     full_slug = match_obj.group(1)
                     parts = full_slug.split('-')
@@ -354,9 +574,8 @@ def extract_html_matches(soup):
                     player2_full = slug_to_name(slug2)
 
             # Extract date and time
-            event_info_time = card.find("div", class_="event_infoTime")
-            if event_info_time and event_info_time.text.strip():
-                date_heure_text = event_info_time.text.strip()
+            if card.info_time:
+                date_heure_text = card.info_time
                 if "Auj." in date_heure_text or "Dem." in date_heure_text:
                     parts = date_heure_text.split()
                     if len(parts) >= 2:
@@ -372,8 +591,8 @@ def extract_html_matches(soup):
                         current_heure = parts[1]
 
             # Extract tournament name from URL
-            if a_tag and "href" in a_tag.attrs:
-                url_parts = a_tag["href"].split("/")
+            if href:
+                url_parts = href.split("/")
                 if len(url_parts) > 2:
                     tournoi_slug_full = url_parts[2]
                     tournoi_match = re.match(r"^(.*?)(-c\d+)?$", tournoi_slug_full)
@@ -394,6 +613,7 @@ def extract_html_matches(soup):
                     "match_url": match_url,
                     "scraped_date": scraped_dt.date().isoformat(),
                     "scraped_time": scraped_dt.time().strftime("%H:%M:%S"),
+                    "source": "html",
                 })
                 
         except Exception as e:
@@ -402,99 +622,110 @@ def extract_html_matches(soup):
     
     return html_matches
 
-def create_match_key(match):
+# Déduplication : chaque match est normalisé une seule fois, puis fusionné par matchId
+_NAME_NOISE_RE = re.compile(r'\(.*?\)|\d+')
+MATCH_ID_RE = re.compile(r'-m(\d+)$')
+MATCH_FIELDS = ("date", "heure", "tournoi", "tour", "player1", "player2", "match_url", "scraped_date", "scraped_time")
+# Source préférée par champ lors d'une fusion : le JSON a les vrais noms, le tournoi et la date absolue,
+# la carte HTML a le vrai lien Betclic (avec -c<id>) ; l'autre source ne sert que si le champ manque
+SOURCE_PRIORITY = {"json": 0, "html": 1}
+FIELD_SOURCE_PRIORITY = {"match_url": {"html": 0, "json": 1}}
+
+def match_id_from_url(match_url):
+    """Betclic match id from the `-m<id>` suffix of a match URL, or None"""
+    match_obj = MATCH_ID_RE.search(match_url or "")
+    return match_obj.group(1) if match_obj else None
+
+@lru_cache(maxsize=4096)
+def canonical_player(name):
+    """Player name as compared by the deduplication: normalized, without parentheses or digits"""
+    return " ".join(_NAME_NOISE_RE.sub("", normalize_name(name)).split())
+
+def _informative(value):
+    return bool(value) and value != "Unknown"
+
+class CanonicalMatch:
     """
-    Create a unique key for match deduplication based on players and time
-    Enhanced to be more robust against variations
+    A scraped match normalized once: its Betclic id, plus a fallback key that
+    is only computed when a comparison needs it. The records of the same match
+    are merged field by field, each field from its preferred source.
     """
-    # Normalize and clean player names
-    p1 = normalize_name(match.get("player1", ""))
-    p2 = normalize_name(match.get("player2", ""))
-    
-    # Remove common prefixes/suffixes that might vary
-    def clean_player_name(name):
-        # Remove common tennis prefixes/suffixes
-        name = re.sub(r'\(.*?\)', '', name)  # Remove parentheses content
-        name = re.sub(r'\d+', '', name)  # Remove numbers
-        name = name.strip().lower()
-        return name
-    
-    p1_clean = clean_player_name(p1)
-    p2_clean = clean_player_name(p2)
-    
-    # Sort players to handle order variations (A vs B = B vs A)
-    players = tuple(sorted([p1_clean, p2_clean]))
-    
-    # Use date and hour for timing (ignore minutes/seconds for fuzzy matching)
-    date_str = str(match.get("date", "")).lower().strip()
-    heure_str = str(match.get("heure", "")).strip()
-    
-    # Extract hour from time string (e.g., "14:30" -> "14")
-    hour = ""
-    if ":" in heure_str:
-        hour = heure_str.split(":")[0]
-    elif heure_str and heure_str.isdigit():
-        hour = heure_str[:2] if len(heure_str) >= 2 else heure_str
-    
-    # Create composite key - more robust
-    key = f"{players}|{date_str}|{hour}"
-    return key
-
-def enhanced_deduplication(matches_list):
+    __slots__ = ("records", "match_id", "_fallback_key", "_merged")
+
+    def __init__(self, record):
+        self.records = [record]
+        self.match_id = match_id_from_url(record.get("match_url", ""))
+        self._fallback_key = None
+        self._merged = record
+
+    @property
+    def record(self):
+        if self._merged is None:
+            # Tri stable : à priorité égale, le premier enregistrement vu l'emporte
+            ranked = {id(priority): sorted(self.records, key=lambda record: priority.get(record.get("source"), len(priority)))
+                      for priority in (SOURCE_PRIORITY, *FIELD_SOURCE_PRIORITY.values())}
+            merged = dict(self.records[0])
+            for field in MATCH_FIELDS:
+                candidates = ranked[id(FIELD_SOURCE_PRIORITY.get(field, SOURCE_PRIORITY))]
+                merged[field] = next((record[field] for record in candidates if _informative(record.get(field))),
+                                     candidates[0].get(field, ""))
+            self._merged = merged
+        return self._merged
+
+    @property
+    def fallback_key(self):
+        """(sorted players, date, hour), used for records without a matchId"""
+        if self._fallback_key is None:
+            player1 = canonical_player(self.record.get("player1", ""))
+            player2 = canonical_player(self.record.get("player2", ""))
+            players = (player1, player2) if player1 <= player2 else (player2, player1)
+            heure = str(self.record.get("heure", "")).strip()
+            hour = heure.split(":")[0] if ":" in heure else heure[:2] if heure.isdigit() else ""
+            self._fallback_key = (players, str(self.record.get("date", "")).lower().strip(), hour)
+        return self._fallback_key
+
+    def merge(self, other):
+        """Add the records of another copy of this match; the merged record is rebuilt on next access"""
+        self.records.extend(other.records)
+        self._merged = None
+        self.match_id = self.match_id or other.match_id
+
+@metrics.timed("deduplicate_matches")
+def deduplicate_matches(matches_list):
     """
-    Enhanced deduplication with multiple checks to avoid any duplicates
+    Merge the JSON and HTML records of the same match in one linear pass.
+    Records are matched by Betclic matchId first, then by (players, date,
+    hour) for records without an id. The same players meeting again in
+    another tournament or on another day stay separate matches.
     """
-    logging.info("=== ENHANCED DEDUPLICATION PROCESS ===")
-    
-    unique_matches = []
-    seen_match_keys = set()
-    seen_urls = set()
-    seen_player_pairs = set()  # Additional check
-    
-    duplicate_count = 0
-    
-    for i, match in enumerate(matches_list):
-        # Multiple deduplication checks
-        match_key = create_match_key(match)
-        match_url = match.get("match_url", "")
-        
-        # Create player pair key (sorted players)
-        p1 = normalize_name(match.get("player1", ""))
-        p2 = normalize_name(match.get("player2", ""))
-        player_pair = tuple(sorted([p1, p2]))
-        
-        # Check for duplicates using multiple criteria
-        is_duplicate = False
-        duplicate_reason = ""
-        
-        if match_key in seen_match_keys:
-            is_duplicate = True
-            duplicate_reason = "match_key"
-        elif match_url and match_url in seen_urls:
-            is_duplicate = True
-            duplicate_reason = "url"
-        elif player_pair in seen_player_pairs:
-            # Additional check: if same players already seen today, it might be duplicate
-            # This is more aggressive but helps catch edge cases
-            current_date = match.get("date", "")
-            if current_date:  # Only apply this check if we have date info
-                is_duplicate = True
-                duplicate_reason = "player_pair"
-        
-        if is_duplicate:
-            duplicate_count += 1
-            logging.debug(f"Duplicate #{duplicate_count} filtered ({duplicate_reason}): {match.get('player1')} vs {match.get('player2')} | {match.get('date')} {match.get('heure')}")
+    matches = [CanonicalMatch(record) for record in matches_list]
+    # Les clés de repli ne servent que s'il existe des enregistrements sans matchId
+    use_fallback = any(match.match_id is None for match in matches)
+    by_id = {}
+    by_key = {}
+    unique = []
+
+    for match in matches:
+        existing = by_id.get(match.match_id) if match.match_id else None
+        if existing is None and use_fallback:
+            existing = by_key.get(match.fallback_key)
+            # Deux ids différents sont deux matchs, même avec les mêmes joueurs à la même heure
+            if existing is not None and match.match_id and existing.match_id and existing.match_id != match.match_id:
+                existing = None
+
+        if existing is None:
+            unique.append(match)
+            existing = match
         else:
-            # Add to seen sets
-            seen_match_keys.add(match_key)
-            if match_url:
-                seen_urls.add(match_url)
-            seen_player_pairs.add(player_pair)
-            
-            unique_matches.append(match)
-    
-    logging.info(f"Deduplication complete: {len(matches_list)} → {len(unique_matches)} (removed {duplicate_count} duplicates)")
-    return unique_matches
+            existing.merge(match)
+        if existing.match_id:
+            by_id.setdefault(existing.match_id, existing)
+        if use_fallback:
+            by_key.setdefault(match.fallback_key, existing)
+
+    logging.info(f"Deduplication complete: {len(matches_list)} → {len(unique)} "
+                 f"(merged {len(matches_list) - len(unique)} duplicates)")
+    return [match.record for match in unique]
 
 def scrape_betclic_simple():
     """
@@ -513,24 +744,20 @@ def scrape_betclic_simple():
         logging.error(f"[{env_type}] Failed to get page content")
         return []
 
-    # Save debug content
-    debug_file = f"page_debug_{env_type.lower()}.html"
-    with open(debug_file, "w", encoding="utf-8") as f:
-        f.write(page_content)
-    logging.info(f"[{env_type}] Page saved to {debug_file}")
+    # Archive the raw page in the background
+    content_hash = page_archive.store(url, page_content)
+    logging.info(f"[{env_type}] Page queued for archiving ({content_hash})")
 
-    soup = BeautifulSoup(page_content, "html.parser")
-    
-    # Count cards on page
-    total_cards = soup.find_all("sports-events-event-card")
-    logging.info(f"[{env_type}] Found {len(total_cards)} card elements on page")
+    # Single pass over the document for both the JSON scripts and the cards
+    scripts, cards = parse_betclic_page(page_content)
+    logging.info(f"[{env_type}] Found {len(cards)} card elements on page ({BETCLIC_HTML_PARSER} parser)")
     
     # Extract matches
     logging.info(f"[{env_type}] Extracting JSON matches...")
-    json_matches = extract_json_matches(soup)
+    json_matches = list(extract_json_matches(scripts))
     
     logging.info(f"[{env_type}] Extracting HTML matches...")
-    html_matches = extract_html_matches(soup)
+    html_matches = extract_html_matches(cards)
     
     # Combine all matches
     all_matches = []
@@ -544,6 +771,202 @@ def scrape_betclic_simple():
     
     return all_matches
 
+# Mode de récupération : "render" (page complète défilée), "direct" (état initial sans rendu, par compétition)
+# ou "sharded" (chaque compétition rendue avec un petit budget de défilement)
+BETCLIC_SPORT_URL = "https://www.betclic.fr/tennis-stennis"
+BETCLIC_FETCH_MODE = os.getenv("BETCLIC_FETCH_MODE", "render")
+BETCLIC_DIRECT_MIN_MATCHES = int(os.getenv("BETCLIC_DIRECT_MIN_MATCHES", "100"))
+BETCLIC_FETCH_CONCURRENCY = int(os.getenv("BETCLIC_FETCH_CONCURRENCY", "5"))
+BETCLIC_DIRECT_TIMEOUT = 70
+BETCLIC_SHARD_SCROLL_COUNT = int(os.getenv("BETCLIC_SHARD_SCROLL_COUNT", "15"))
+BETCLIC_SHARD_WAIT_MS = int(os.getenv("BETCLIC_SHARD_WAIT_MS", "10000"))
+BETCLIC_COMPETITIONS_PATH = os.getenv("BETCLIC_COMPETITIONS_PATH", ".cache/betclic_competitions.json")
+BETCLIC_COMPETITIONS_MAX_AGE = float(os.getenv("BETCLIC_COMPETITIONS_MAX_AGE_DAYS", "3")) * 86400
+COMPETITION_PATH_RE = re.compile(r"^/tennis-stennis/([a-z0-9\-]+-c(\d+))(?:/|$)")
+COMPETITION_ID_RE = re.compile(r"-c(\d+)(?:/|$)")
+def count_unique_matches(matches):
+    return len({match_id_from_url(m["match_url"]) for m in matches} - {None})
+
+def extract_page_matches(page_content):
+    """Parse one Betclic page. Returns: (json_matches + html_matches, scripts, cards)"""
+    scripts, cards = parse_betclic_page(page_content)
+    return list(extract_json_matches(scripts)) + extract_html_matches(cards), scripts, cards
+
+def competition_slug(name):
+    """Betclic-style slug of a competition name ("Open d'Australie" -> "open-d-australie")"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    return re.sub(r"[^a-z0-9]+", "-", ascii_name).strip("-")
+
+def competition_id(url):
+    match_obj = COMPETITION_ID_RE.search(url)
+    return match_obj.group(1) if match_obj else None
+
+def discover_competition_urls(scripts, cards):
+    """
+    Competition page URLs (`<slug>-c<id>`), one per competition id. The card
+    links are the source of truth; a URL is only built from the JSON
+    competition name for ids that no card showed.
+    """
+    urls = {}
+    for card in cards:
+        match_obj = COMPETITION_PATH_RE.match(card.href or "")
+        if match_obj:
+            urls.setdefault(match_obj.group(2), f"{BETCLIC_SPORT_URL}/{match_obj.group(1)}")
+    for script_content in scripts:
+        for match_data in iter_json_match_data(script_content):
+            competition = match_data.get("competition") or {}
+            if competition.get("id") and competition.get("name") and str(competition["id"]) not in urls:
+                urls[str(competition["id"])] = f"{BETCLIC_SPORT_URL}/{competition_slug(competition['name'])}-c{competition['id']}"
+    return sorted(urls.values())
+
+def read_known_competitions():
+    """Competition URLs seen by recent runs, {url: last_seen_timestamp}"""
+    try:
+        with open(BETCLIC_COMPETITIONS_PATH, "r", encoding="utf-8") as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {url: seen for url, seen in known.items() if now - seen <= BETCLIC_COMPETITIONS_MAX_AGE}
+
+def write_known_competitions(known):
+    try:
+        os.makedirs(os.path.dirname(BETCLIC_COMPETITIONS_PATH) or ".", exist_ok=True)
+        tmp_path = f"{BETCLIC_COMPETITIONS_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(known, f)
+        os.replace(tmp_path, BETCLIC_COMPETITIONS_PATH)
+    except OSError as e:
+        logging.warning(f"Could not write known competitions {BETCLIC_COMPETITIONS_PATH}: {e}")
+
+def scraperapi_params(scroll_count=None):
+    """ScraperAPI parameters: no rendering by default, or a render with a bounded scroll budget"""
+    params = {
+        'api_key': SCRAPERAPI_KEY,
+        'country_code': 'fr',
+        'device_type': 'desktop',
+        'premium': 'true',
+        'keep_headers': 'true',
+        'format': 'html',
+    }
+    if scroll_count is not None:
+        params.update({
+            'render': 'true',
+            'wait': str(BETCLIC_SHARD_WAIT_MS),
+            'scroll': 'true',
+            'scroll_to_bottom': 'true',
+            'scroll_count': str(scroll_count),
+            'scroll_timeout': '3000',
+            'scroll_pause_time': '500',
+        })
+    return params
+
+def scraperapi_timeout(params):
+    # Rendu : attente initiale + environ 3,5 s par défilement, avec une marge
+    if params.get('render') != 'true':
+        return BETCLIC_DIRECT_TIMEOUT
+    return int(params['wait']) / 1000 + int(params['scroll_count']) * 3.5 + 60
+
+def scraperapi_credits(params):
+    return SCRAPERAPI_RENDER_CREDITS if params.get('render') == 'true' else SCRAPERAPI_PREMIUM_CREDITS
+
+@metrics.timed("scraperapi_fetch")
+async def fetch_scraperapi_page(client, semaphore, url, params, retries=2):
+    """Fetch one page through ScraperAPI without blocking the other fetches. Returns the HTML or None"""
+    for attempt in range(retries):
+        try:
+            async with semaphore:
+                attempt_start = time.perf_counter()
+                response = await client.get(SCRAPERAPI_ENDPOINT, params={**params, 'url': url},
+                                            timeout=scraperapi_timeout(params))
+            record_scraperapi_attempt(url, attempt, time.perf_counter() - attempt_start, response.status_code,
+                                      len(response.content), scraperapi_credits(params))
+            if response.status_code == 200:
+                return response.text
+            logging.warning(f"ScraperAPI status {response.status_code} for {url} (attempt {attempt + 1}/{retries})")
+        except httpx.HTTPError as e:
+            logging.warning(f"ScraperAPI request failed for {url}: {e} (attempt {attempt + 1}/{retries})")
+    return None
+
+async def scrape_competition_pages(label, shard_params, extra_urls=()):
+    """
+    Fetch the tennis page without rendering to discover the competitions,
+    then every competition page in parallel with `shard_params`, and merge
+    their matches. A failed competition only loses its own matches.
+    Returns: (matches, fetched_urls, failed_urls)
+    """
+    semaphore = asyncio.Semaphore(BETCLIC_FETCH_CONCURRENCY)
+    async with httpx.AsyncClient(headers=SCRAPERAPI_HEADERS) as client:
+        page_content = await fetch_scraperapi_page(client, semaphore, BETCLIC_SPORT_URL, scraperapi_params())
+        if page_content:
+            page_archive.store(BETCLIC_SPORT_URL, page_content)
+            matches, scripts, cards = extract_page_matches(page_content)
+            competition_urls = discover_competition_urls(scripts, cards)
+        else:
+            logging.error(f"{label}: failed to get the sport page")
+            matches, competition_urls = [], []
+        # Une seule page par id de compétition : les URLs de la page du jour priment sur celles des runs précédents
+        discovered_ids = {competition_id(url) for url in competition_urls}
+        competition_urls = sorted(set(competition_urls).union(
+            url for url in extra_urls if competition_id(url) not in discovered_ids))
+        logging.info(f"{label}: {len(matches)} matches on the sport page, {len(competition_urls)} competitions to fetch")
+
+        pages = await asyncio.gather(*[
+            fetch_scraperapi_page(client, semaphore, competition_url, shard_params)
+            for competition_url in competition_urls
+        ])
+
+    fetched, failed = [], []
+    for competition_url, competition_page in zip(competition_urls, pages):
+        if not competition_page:
+            failed.append(competition_url)
+            continue
+        fetched.append(competition_url)
+        page_archive.store(competition_url, competition_page)
+        competition_matches, _, _ = extract_page_matches(competition_page)
+        logging.info(f"{label}: {len(competition_matches)} matches from {competition_url}")
+        matches.extend(competition_matches)
+    if failed:
+        logging.warning(f"{label}: {len(failed)}/{len(competition_urls)} competition pages failed")
+    return matches, fetched, failed
+
+async def scrape_betclic_direct():
+    """
+    Direct mode: read the server-rendered initial state of the sport page and
+    of every competition page, without browser rendering or scrolling.
+    Competition pages are fetched in parallel, each one carrying its own
+    "matches" state, so the list is paginated by competition.
+    """
+    matches, _, _ = await scrape_competition_pages("Direct mode", scraperapi_params())
+    return matches
+
+async def scrape_betclic_sharded():
+    """
+    Sharded mode: render every competition page with a small scroll budget
+    instead of scrolling one giant page. Competitions seen by recent runs are
+    fetched too, so a sport page missing some of them loses nothing.
+    """
+    known = read_known_competitions()
+    matches, fetched, _ = await scrape_competition_pages(
+        "Sharded mode", scraperapi_params(BETCLIC_SHARD_SCROLL_COUNT), extra_urls=known)
+    now = time.time()
+    known.update({competition_url: now for competition_url in fetched})
+    write_known_competitions(known)
+    return matches
+
+def scrape_betclic():
+    """Scrape the upcoming matches with BETCLIC_FETCH_MODE, the render path being the fallback"""
+    if BETCLIC_FETCH_MODE in ("direct", "sharded"):
+        scrape = scrape_betclic_direct if BETCLIC_FETCH_MODE == "direct" else scrape_betclic_sharded
+        matches = asyncio.run(scrape())
+        unique_matches = count_unique_matches(matches)
+        if unique_matches >= BETCLIC_DIRECT_MIN_MATCHES:
+            logging.info(f"{BETCLIC_FETCH_MODE} mode: {unique_matches} unique matches ({len(matches)} raw)")
+            return matches
+        logging.warning(f"{BETCLIC_FETCH_MODE} mode returned {unique_matches} unique matches (expected at least "
+                        f"{BETCLIC_DIRECT_MIN_MATCHES}), falling back to the render path")
+    return scrape_betclic_simple()
+
 def normalize_name(name):
     """Normalize player name for comparison"""
     return ' '.join(str(name).replace('\xa0', ' ').split()).lower()
@@ -555,41 +978,507 @@ def player_to_tennisabstract_url(player_name_on_site):
     normalized_for_url = normalized_for_url.replace(' ', '').replace('-', '')
     return f"https://www.tennisabstract.com/cgi-bin/player.cgi?p={normalized_for_url}"
 
-def find_best_slug_url(name, elo_df_local):
-    """Find the best matching player URL from ELO data
+# Score minimal (0-1) pour accepter un rapprochement approximatif avec la base ELO
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.75"))
+
+class NameResolver:
+    """
+    Resolves site player names to ELO player names, built once per run.
+    Exact hits come from a dict of normalized names; other names go through
+    the trigram NameMatcher (accent-folded, initials-aware), and every
+    answer is memoized.
+    """
+    def __init__(self, elo_names, threshold=NAME_MATCH_THRESHOLD, version=None):
+        self.threshold = threshold
+        # Version de la table ELO chargée, enregistrée avec les noms absents
+        self.version = version
+        self.by_normalized = {}
+        for elo_name in elo_names:
+            normalized = normalize_name(elo_name)
+            if normalized and normalized not in self.by_normalized:
+                self.by_normalized[normalized] = elo_name
+        self.matcher = NameMatcher(self.by_normalized.values())
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.by_normalized)
+
+    def resolve(self, name):
+        """Return (elo_name, exact) for the best ELO match, or (None, False)"""
+        normalized = normalize_name(name)
+        if normalized in self._memo:
+            return self._memo[normalized]
+
+        if normalized in self.by_normalized:
+            result = (self.by_normalized[normalized], True)
+        else:
+            matched_elo_name, score = self.matcher.best(name, self.threshold)
+            result = (matched_elo_name, False)
+            if matched_elo_name is not None:
+                logging.debug(f"Fuzzy match for '{name}' -> '{matched_elo_name}' (score {score:.2f})")
+
+        self._memo[normalized] = result
+        return result
+
+# Table des alias : nom Betclic -> joueur ELO et URL Tennis Abstract, corrigeable à la main
+ALIAS_TABLE = os.getenv("PLAYER_ALIAS_TABLE", "player_aliases")
+ALIAS_COLUMNS = "alias,betclic_name,elo_player,tennis_abstract_url,match_type,elo_version"
+# Colonnes d'une table créée avant elo_version : les noms absents n'y sont pas enregistrés
+ALIAS_LEGACY_COLUMNS = "alias,betclic_name,elo_player,tennis_abstract_url"
+# Ligne écrite pour un nom absent de la table ELO, valable tant que la table ne change pas
+ALIAS_MISS = "none"
+
+class PlayerAliases:
+    """
+    Persisted map from Betclic player names to ELO players, stored in Supabase.
+
+    Rows are keyed on the normalized Betclic name (`alias`). Names resolved
+    during a run are written back at the end with ignore-duplicates, so rows
+    edited by hand are never overwritten. A row whose `elo_player` is null
+    marks a player known to be absent from the ELO table: names with no
+    match are written with match_type "none" and the ELO table version, and
+    only go through the fuzzy search again once that version changes.
+    """
+    def __init__(self, table=ALIAS_TABLE):
+        self.table = table
+        self.by_alias = {}
+        self.pending = {}
+        # Noms absents enregistrés sur une ancienne version de la table ELO, réécrits au save
+        self.stale = set()
+        self.elo_version = None
+        self.record_misses = True
+        self.available = True
+        self.hits = 0
+
+    async def load(self):
+        try:
+            try:
+                rows = await supabase.select(self.table, ALIAS_COLUMNS)
+            except SupabaseError as e:
+                if e.code != "42703":
+                    raise
+                logging.warning(f"{self.table} has no match_type/elo_version column, absent players are not remembered "
+                                f"(see the README to add it)")
+                self.record_misses = False
+                rows = await supabase.select(self.table, ALIAS_LEGACY_COLUMNS)
+        except SupabaseError as e:
+            # Table absente : on continue sans alias (voir le README pour la créer)
+            logging.warning(f"Player aliases unavailable ({self.table}): {e.message}")
+            self.available = False
+            return
+        if any(row.get("match_type") == ALIAS_MISS for row in rows):
+            try:
+                self.elo_version = await elo_table_version()
+            except SupabaseError as e:
+                logging.warning(f"Could not read the ELO table version, absent players are matched again: {e.message}")
+        for row in rows:
+            if not (row.get("alias") and row.get("tennis_abstract_url")):
+                continue
+            if row.get("match_type") == ALIAS_MISS and (self.elo_version is None or row.get("elo_version") != self.elo_version):
+                self.stale.add(row["alias"])
+                continue
+            self.by_alias[row["alias"]] = (row["tennis_abstract_url"], row.get("elo_player") is not None)
+        logging.info(f"Loaded {len(self.by_alias)} player aliases ({len(self.stale)} absent players to match again)")
+
+    def __contains__(self, name):
+        return normalize_name(name) in self.by_alias
+
+    def get(self, name):
+        """Return (url, found_in_elo_db) for a known name, or None"""
+        alias = normalize_name(name)
+        result = self.by_alias.get(alias)
+        if result is not None and alias not in self.pending:
+            self.hits += 1
+        return result
+
+    def record(self, name, elo_player, url, match_type, elo_version=None):
+        """Remember a resolved name; elo_player None (match_type "none") marks a name absent from ELO version `elo_version`"""
+        alias = normalize_name(name)
+        if not alias or alias in self.by_alias or (elo_player is None and not self.record_misses):
+            return
+        self.by_alias[alias] = (url, elo_player is not None)
+        self.pending[alias] = {
+            "alias": alias,
+            "betclic_name": name,
+            "elo_player": elo_player,
+            "tennis_abstract_url": url,
+            "match_type": match_type,
+        }
+        if self.record_misses:
+            self.pending[alias]["elo_version"] = elo_version
+
+    async def save(self):
+        """Write the aliases confirmed during this run. Returns the number of new or refreshed rows"""
+        if not self.available or not self.pending:
+            return 0
+        # Les lignes "none" périmées sont remplacées, les autres lignes existantes jamais
+        refreshed = [row for alias, row in self.pending.items() if alias in self.stale]
+        new = [row for alias, row in self.pending.items() if alias not in self.stale]
+        saved = 0
+        try:
+            if new:
+                saved += await supabase.upsert(self.table, new, on_conflict="alias", ignore_duplicates=True)
+            if refreshed:
+                saved += await supabase.upsert(self.table, refreshed, on_conflict="alias")
+        except SupabaseError as e:
+            logging.error(f"Could not save player aliases: {e.message}")
+        return saved
+
+@metrics.timed("find_best_slug_url")
+def find_best_slug_url(name, resolver, aliases=None):
+    """Find the best matching player URL from the alias table, then from ELO data
     Returns: (url, found_in_elo_db)
     """
-    if elo_df_local.empty:
+    if aliases is not None:
+        known = aliases.get(name)
+        if known is not None:
+            return known
+
+    if resolver is None or not len(resolver):
         return player_to_tennisabstract_url(name), False
 
-    norm_name_site = normalize_name(name)
+    matched_elo_name, exact = resolver.resolve(name)
+    if matched_elo_name is not None:
+        logging.debug(f"{'Exact' if exact else 'Close'} match for '{name}' -> '{matched_elo_name}'")
+        url = player_to_tennisabstract_url(matched_elo_name)
+        if aliases is not None:
+            aliases.record(name, matched_elo_name, url, "exact" if exact else "fuzzy", resolver.version)
+        return url, True
+
+    # Fallback - player not found in ELO DB
+    logging.warning(f"No close match for '{name}' in Elo DB. Using direct conversion.")
+    url = player_to_tennisabstract_url(name)
+    if aliases is not None:
+        aliases.record(name, None, url, ALIAS_MISS, resolver.version)
+    return url, False
+
+# Chargement de la table ELO : seules les colonnes utiles, par pages en parallèle, avec cache local
+ELO_TABLE = "atp_elo_ratings"
+ELO_COLUMNS = "player"
+ELO_PAGE_SIZE = int(os.getenv("ELO_PAGE_SIZE", "1000"))
+ELO_CACHE_PATH = os.getenv("ELO_CACHE_PATH", ".cache/atp_elo_ratings.json")
+ELO_CACHE_MAX_AGE = float(os.getenv("ELO_CACHE_MAX_AGE_HOURS", "24")) * 3600
+
+def read_elo_cache(version):
+    """Return the cached ELO players if the cache matches the table version and is recent enough"""
+    try:
+        with open(ELO_CACHE_PATH, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get("version") != version or cache.get("columns") != ELO_COLUMNS:
+        return None
+    if time.time() - cache.get("saved_at", 0) > ELO_CACHE_MAX_AGE:
+        return None
+    return cache.get("players")
+
+def write_elo_cache(version, players):
+    try:
+        os.makedirs(os.path.dirname(ELO_CACHE_PATH) or ".", exist_ok=True)
+        tmp_path = f"{ELO_CACHE_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "columns": ELO_COLUMNS, "saved_at": time.time(), "players": players}, f)
+        os.replace(tmp_path, ELO_CACHE_PATH)
+    except OSError as e:
+        logging.warning(f"Could not write ELO cache {ELO_CACHE_PATH}: {e}")
+
+async def elo_table_version():
+    """Version of the ELO table (exact row count + highest id), read with a single request"""
+    last_row, total = await supabase.select_page(ELO_TABLE, "id", offset=0, limit=1, order="id.desc", count=True)
+    return f"{total}:{last_row[0]['id'] if last_row else None}"
+
+@metrics.timed("load_elo_players")
+async def load_elo_players(version=None):
+    """
+    Load the ELO players needed for name matching.
+    The table version is checked with a single request (or given by the
+    caller); the local cache is used when it matches, otherwise every page is
+    fetched in parallel with Range headers so max-rows never truncates it.
+    """
+    version = version or await elo_table_version()
+
+    players = read_elo_cache(version)
+    if players is not None:
+        logging.info(f"Using cached ELO players ({len(players)} rows, version {version})")
+        return players
+
+    # "<nombre de lignes>:<id max>", le nombre vaut "None" si le serveur ne l'a pas donné
+    count = version.split(":", 1)[0]
+    total = int(count) if count.isdigit() else 0
+    pages = await asyncio.gather(*[
+        supabase.select_page(ELO_TABLE, ELO_COLUMNS, offset=offset, limit=ELO_PAGE_SIZE, order="id")
+        for offset in range(0, total, ELO_PAGE_SIZE)
+    ])
+    players = [row for page, _ in pages for row in page]
+    if len(players) < total:
+        # max-rows du projet plus petit que ELO_PAGE_SIZE : on repagine à sa taille
+        page_size = max(1, len(pages[0][0]))
+        logging.warning(f"ELO pages capped at {page_size} rows by the server, paging again")
+        players = await supabase.select(ELO_TABLE, ELO_COLUMNS, page_size=page_size, order="id")
+
+    logging.info(f"Fetched {len(players)} ELO players in {len(pages)} pages (version {version})")
+    write_elo_cache(version, players)
+    return players
+
+# Pipeline d'upload en flux : dédup -> joueurs -> filtre ELO -> lots envoyés dès qu'ils sont pleins
+UPCOMING_TABLE = "upcoming_matches"
+UPCOMING_BATCH_SIZE = int(os.getenv("UPCOMING_BATCH_SIZE", "100"))
+
+class UpcomingMatch:
+    """One deduplicated match on its way to upcoming_matches"""
+    __slots__ = MATCH_FIELDS + ("player1_url", "player2_url", "player1_found_in_elo_db", "player2_found_in_elo_db")
+    UPLOAD_COLUMNS = ("date", "heure", "tournoi", "tour", "player1", "player2", "match_url",
+                      "player1_url", "player2_url", "scraped_date", "scraped_time")
+
+    def __init__(self, record):
+        for field in MATCH_FIELDS:
+            setattr(self, field, record.get(field, ""))
+        self.player1_url = self.player2_url = None
+        self.player1_found_in_elo_db = self.player2_found_in_elo_db = False
+
+    def to_row(self):
+        return {column: getattr(self, column) for column in self.UPLOAD_COLUMNS}
+
+def iter_unique_matches(raw_matches):
+    # Seule barrière du pipeline : les doublons JSON/HTML doivent être vus ensemble pour être fusionnés
+    for record in deduplicate_matches(raw_matches):
+        yield UpcomingMatch(record)
+
+async def load_name_resolver(version=None):
+    """NameResolver over the ELO players, empty when they cannot be loaded"""
+    try:
+        version = version or await elo_table_version()
+        elo_players = await load_elo_players(version)
+    except Exception as e:
+        logging.error(f"Error retrieving ELO data: {e}")
+        elo_players = []
+    if elo_players:
+        logging.info(f"Loaded {len(elo_players)} players from ELO data")
+    else:
+        logging.warning("No ELO data received.")
+    return NameResolver((p["player"] for p in elo_players if p.get("player")), version=version)
+
+async def resolve_players(matches, aliases, stats):
+    """Set the Tennis Abstract URL of both players; the ELO table is only loaded for the first name missing from the aliases"""
+    resolver = None
+    for match in matches:
+        for side in ("player1", "player2"):
+            name = getattr(match, side)
+            if resolver is None and name not in aliases:
+                logging.info(f"'{name}' is not in the alias table, retrieving ELO data from Supabase...")
+                resolver = await load_name_resolver(aliases.elo_version)
+            if name not in aliases:
+                stats["new_names"].add(name)
+            url, found = find_best_slug_url(name, resolver, aliases)
+            setattr(match, f"{side}_url", url)
+            setattr(match, f"{side}_found_in_elo_db", found)
+        yield match
+
+async def keep_elo_matches(matches, stats):
+    """Only keep matches where both players are found in the ELO database"""
+    async for match in matches:
+        stats["resolved"] += 1
+        if match.player1_found_in_elo_db and match.player2_found_in_elo_db:
+            stats["kept"] += 1
+            yield match
+
+async def batch_rows(matches, batch_size):
+    batch = []
+    async for match in matches:
+        batch.append(match.to_row())
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def delete_all_upcoming(env_type):
+    # Delete old matches
+    logging.info(f"[{env_type}] Deleting old matches from '{UPCOMING_TABLE}' table...")
+    try:
+        await supabase.delete(UPCOMING_TABLE, {"id": "neq.-1"})
+        logging.info(f"[{env_type}] Successfully deleted old matches")
+    except Exception as e:
+        logging.error(f"[{env_type}] Error deleting old matches: {e}")
+
+async def upload_upcoming_matches(batches, env_type, before_first_batch=None):
+    """
+    Insert each batch as soon as it is produced, without waiting for the next
+    ones; `before_first_batch` is awaited once, only if there is something to insert.
+    Returns: (rows inserted, batches that failed)
+    """
+    insert_tasks = []
+    async for batch in batches:
+        if not insert_tasks and before_first_batch is not None:
+            await before_first_batch()
+        insert_tasks.append(asyncio.create_task(supabase.insert(UPCOMING_TABLE, batch, chunk_size=len(batch))))
+        logging.info(f"[{env_type}] Batch {len(insert_tasks)} queued for insert ({len(batch)} matches)")
+        # La chaîne de production ne rend jamais la main : on laisse l'insert partir avant le lot suivant
+        await asyncio.sleep(0)
+
+    results = await asyncio.gather(*insert_tasks, return_exceptions=True)
+    total_inserted = 0
+    failed = 0
+    for batch_index, result in enumerate(results, start=1):
+        if isinstance(result, Exception):
+            logging.error(f"[{env_type}] Error inserting batch {batch_index}: {result}")
+            failed += 1
+        else:
+            total_inserted += result
+    metrics.add("rows_inserted", total_inserted)
+    return total_inserted, failed
+
+# Mode de synchronisation : delta (défaut), snapshot ou replace.
+# Mode snapshot : chaque run écrit ses lignes avec son run_id, puis une seule ligne
+# insérée dans la table des snapshots les publie (la vue current_upcoming_matches suit la plus récente)
+UPCOMING_SYNC_MODE = os.getenv("UPCOMING_SYNC_MODE", "delta")
+UPCOMING_SNAPSHOT_TABLE = os.getenv("UPCOMING_SNAPSHOT_TABLE", "upcoming_matches_snapshots")
+UPCOMING_SNAPSHOTS_KEPT = max(1, int(os.getenv("UPCOMING_SNAPSHOTS_KEPT", "2")))
+
+async def tag_batches(batches, run_id):
+    async for batch in batches:
+        for row in batch:
+            row["run_id"] = run_id
+        yield batch
+
+async def published_snapshots():
+    """run_ids of the published snapshots, most recent first"""
+    rows = await supabase.select(UPCOMING_SNAPSHOT_TABLE, "run_id", order="published_at.desc")
+    return [row["run_id"] for row in rows]
+
+def run_ids_filter(run_ids):
+    return f"({','.join(run_ids)})"
+
+async def publish_snapshot(run_id, match_count, published, env_type):
+    """Make `run_id` the current snapshot in one write, then prune the snapshots no longer kept"""
+    await supabase.insert(UPCOMING_SNAPSHOT_TABLE, [{"run_id": run_id, "match_count": match_count}])
+    logging.info(f"[{env_type}] Snapshot {run_id} published ({match_count} matches)")
+
+    # Le snapshot précédent est gardé pour les lecteurs qui paginent encore dessus
+    kept = [run_id] + published[:UPCOMING_SNAPSHOTS_KEPT - 1]
+    try:
+        await supabase.delete(UPCOMING_TABLE, {"or": f"(run_id.is.null,run_id.not.in.{run_ids_filter(kept)})"})
+        await supabase.delete(UPCOMING_SNAPSHOT_TABLE, {"run_id": f"not.in.{run_ids_filter(kept)}"})
+    except SupabaseError as e:
+        logging.warning(f"[{env_type}] Could not prune old snapshots: {e.message}")
+
+async def sync_snapshot(batches, env_type):
+    """Upload a new snapshot and publish it only if every batch was inserted. Returns the number of rows inserted"""
+    try:
+        published = await published_snapshots()
+    except SupabaseError as e:
+        logging.error(f"[{env_type}] Snapshot table '{UPCOMING_SNAPSHOT_TABLE}' unavailable ({e.message}), replacing the table instead")
+        total_inserted, _ = await upload_upcoming_matches(batches, env_type, lambda: delete_all_upcoming(env_type))
+        return total_inserted
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    total_inserted, failed = await upload_upcoming_matches(tag_batches(batches, run_id), env_type)
+    if failed or not total_inserted:
+        current = published[0] if published else None
+        logging.error(f"[{env_type}] Snapshot {run_id} not published ({failed} failed batches), readers keep snapshot {current}")
+        try:
+            await supabase.delete(UPCOMING_TABLE, {"run_id": f"eq.{run_id}"})
+        except SupabaseError as e:
+            logging.warning(f"[{env_type}] Could not remove the partial snapshot {run_id}: {e.message}")
+        return 0
 
-    # Try exact match
-    elo_df_local['normalized_player'] = elo_df_local['player'].apply(normalize_name)
-    exact_match = elo_df_local[elo_df_local['normalized_player'] == norm_name_site]
-    if not exact_match.empty:
-        matched_elo_name = exact_match['player'].iloc[0]
-        logging.debug(f"Exact match for '{name}' -> '{matched_elo_name}'")
-        return player_to_tennisabstract_url(matched_elo_name), True
+    await publish_snapshot(run_id, total_inserted, published, env_type)
+    return total_inserted
 
-    # Try approximate match
-    names_list_elo = elo_df_local['normalized_player'].tolist()
-    close_matches = difflib.get_close_matches(norm_name_site, names_list_elo, n=1, cutoff=0.80)
+# Mode delta : la table est clé sur l'id Betclic (-m<id>) ; seuls les matchs nouveaux ou
+# reprogrammés sont écrits et seuls ceux qui ont disparu de Betclic sont supprimés
+DELTA_FIELDS = ("date", "heure")
+DELTA_DELETE_CHUNK = 200
 
-    if close_matches:
-        matched_normalized_name = close_matches[0]
-        original_elo_name_series = elo_df_local[elo_df_local['normalized_player'] == matched_normalized_name]['player']
-        if not original_elo_name_series.empty:
-            original_elo_name = original_elo_name_series.iloc[0]
-            logging.debug(f"Close match for '{name}' ({norm_name_site}) -> '{original_elo_name}' ({matched_normalized_name})")
-            return player_to_tennisabstract_url(original_elo_name), True
+async def sync_delta(batches, env_type):
+    """Upsert the new and rescheduled matches, then delete the ones no longer listed. Returns the number of matches in sync"""
+    try:
+        existing_rows = await supabase.select(UPCOMING_TABLE, ",".join(("match_id",) + DELTA_FIELDS))
+    except SupabaseError as e:
+        logging.error(f"[{env_type}] '{UPCOMING_TABLE}' has no usable match_id column ({e.message}), replacing the table instead")
+        total_inserted, _ = await upload_upcoming_matches(batches, env_type, lambda: delete_all_upcoming(env_type))
+        return total_inserted
+    existing = {row["match_id"]: tuple(row[field] for field in DELTA_FIELDS) for row in existing_rows if row["match_id"]}
+
+    seen = set()
+    counts = {"new": 0, "rescheduled": 0, "unchanged": 0, "no_id": 0}
+    upsert_tasks = []
+    async for batch in batches:
+        changed = []
+        for row in batch:
+            match_id = match_id_from_url(row["match_url"])
+            if match_id is None:
+                counts["no_id"] += 1
+                continue
+            if match_id in seen:
+                continue
+            seen.add(match_id)
+            previous = existing.get(match_id)
+            if previous == tuple(row[field] for field in DELTA_FIELDS):
+                counts["unchanged"] += 1
+                continue
+            counts["new" if previous is None else "rescheduled"] += 1
+            row["match_id"] = match_id
+            changed.append(row)
+        if changed:
+            upsert_tasks.append(asyncio.create_task(
+                supabase.upsert(UPCOMING_TABLE, changed, on_conflict="match_id", chunk_size=len(changed))))
+            await asyncio.sleep(0)
+
+    results = await asyncio.gather(*upsert_tasks, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, Exception)]
+    written = sum(result for result in results if not isinstance(result, Exception))
+    for error in errors:
+        logging.error(f"[{env_type}] Error upserting matches: {error}")
+
+    metrics.add("rows_upserted", written)
+    dropped = [match_id for match_id in existing if match_id not in seen]
+    if errors or not seen:
+        # Scraping ou écriture incomplets : on ne supprime rien plutôt que de vider la table
+        logging.warning(f"[{env_type}] Skipping the removal of {len(dropped)} dropped matches after an incomplete sync")
+        dropped = []
+    try:
+        for i in range(0, len(dropped), DELTA_DELETE_CHUNK):
+            chunk = dropped[i:i + DELTA_DELETE_CHUNK]
+            await supabase.delete(UPCOMING_TABLE, {"match_id": f"in.({','.join(chunk)})"})
+        if seen and not errors:
+            # Lignes écrites avant le passage au mode delta
+            await supabase.delete(UPCOMING_TABLE, {"match_id": "is.null"})
+    except SupabaseError as e:
+        logging.error(f"[{env_type}] Error deleting dropped matches: {e.message}")
+
+    logging.info(f"[{env_type}] Delta sync: {counts['new']} new, {counts['rescheduled']} rescheduled, "
+                 f"{counts['unchanged']} unchanged, {len(dropped)} dropped, {counts['no_id']} without match id "
+                 f"({written} rows written)")
+    return counts["unchanged"] + written
+
+async def sync_upcoming_matches(raw_matches, env_type, stats):
+    """Run the streaming pipeline over the scraped matches. Returns the number of matches synced"""
+    async with supabase:
+        # Known players are resolved from the alias table
+        aliases = PlayerAliases()
+        await aliases.load()
+
+        matches = iter_unique_matches(raw_matches)
+        kept = keep_elo_matches(resolve_players(matches, aliases, stats), stats)
+        batches = batch_rows(kept, UPCOMING_BATCH_SIZE)
+        if UPCOMING_SYNC_MODE == "delta":
+            total_inserted = await sync_delta(batches, env_type)
+        elif UPCOMING_SYNC_MODE == "snapshot":
+            total_inserted = await sync_snapshot(batches, env_type)
+        else:
+            total_inserted, _ = await upload_upcoming_matches(batches, env_type, lambda: delete_all_upcoming(env_type))
 
-    # Fallback - player not found in ELO DB
-    logging.warning(f"No close match for '{name}' in Elo DB. Using direct conversion.")
-    return player_to_tennisabstract_url(name), False
+        new_aliases = await aliases.save()
+        logging.info(f"[{env_type}] Player names: {aliases.hits} alias hits, {len(stats['new_names'])} new names, {new_aliases} new aliases saved")
+        return total_inserted
 
 def main():
     """Main function with single, reliable strategy"""
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logging.critical("SUPABASE_URL and SUPABASE_KEY environment variables are not set or empty.")
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set for the script to run.")
+
     try:
         is_render = 'RENDER' in os.environ
         env_type = "RENDER" if is_render else "LOCAL"
@@ -597,99 +1486,34 @@ def main():
         logging.info(f"=== [{env_type}] STARTING BETCLIC SCRAPER ===")
 
         # Use single, reliable scraping strategy
-        raw_matches = scrape_betclic_simple()
+        with metrics.stage("scrape"):
+            raw_matches = scrape_betclic()
+        metrics.add("matches_raw", len(raw_matches))
 
         if not raw_matches:
             logging.warning(f"[{env_type}] No matches found after scraping")
             return
 
-        # Apply enhanced deduplication
-        logging.info(f"[{env_type}] Applying deduplication...")
-        all_matches = enhanced_deduplication(raw_matches)
-
-        # Create DataFrame
-        df = pd.DataFrame(all_matches)
-        logging.info(f"[{env_type}] Created DataFrame with {len(df)} matches")
-
-        # Get ELO data from Supabase
-        logging.info(f"[{env_type}] Retrieving ELO data from Supabase...")
-        try:
-            elo_response = supabase.table("atp_elo_ratings").select("*")
-            if elo_response["error"] is None and elo_response["data"]:
-                elo_players = elo_response["data"]
-                elo_df = pd.DataFrame(elo_players)
-                logging.info(f"[{env_type}] Loaded {len(elo_df)} players from ELO data")
-            else:
-                logging.warning(f"[{env_type}] No ELO data received. Error: {elo_response['error']}")
-                elo_df = pd.DataFrame(columns=['player'])
-        except Exception as e:
-            logging.error(f"[{env_type}] Error retrieving ELO data: {e}")
-            elo_df = pd.DataFrame(columns=['player'])
-
-        # Generate Tennis Abstract URLs
-        logging.info(f"[{env_type}] Generating Tennis Abstract URLs...")
-        df["player1_url"], df["player1_found_in_elo_db"] = zip(*df["player1"].apply(lambda n: find_best_slug_url(n, elo_df)))
-        df["player2_url"], df["player2_found_in_elo_db"] = zip(*df["player2"].apply(lambda n: find_best_slug_url(n, elo_df)))
-
-        # Prepare final columns
-        final_columns = ["date", "heure", "tournoi", "tour", "player1", "player2", "match_url",
-                         "player1_url", "player2_url", "scraped_date", "scraped_time", "player1_found_in_elo_db", "player2_found_in_elo_db"]
-
-        for col in final_columns:
-            if col not in df.columns:
-                df[col] = None if col.endswith("_url") else ""
-
-        df_for_upload = df[final_columns].copy()
-
-        # Apply ELO filtering - only keep matches where both players are found in ELO database
-        matches_before_elo_filter = len(df_for_upload)
-        elo_condition = (df_for_upload["player1_found_in_elo_db"] == True) & (df_for_upload["player2_found_in_elo_db"] == True)
-        df_for_upload = df_for_upload[elo_condition]
-        matches_after_elo_filter = len(df_for_upload)
-        
-        logging.info(f"[{env_type}] ELO filtering: {matches_before_elo_filter} → {matches_after_elo_filter} matches (removed {matches_before_elo_filter - matches_after_elo_filter} matches with players not in ELO DB)")
-
-        # Remove the ELO indicator columns before upload (not needed in database)
-        df_for_upload = df_for_upload.drop(columns=["player1_found_in_elo_db", "player2_found_in_elo_db"])
-
-        # Delete old matches
-        logging.info(f"[{env_type}] Deleting old matches from 'upcoming_matches' table...")
-        try:
-            delete_response = supabase.table("upcoming_matches").delete_rows(params={"id": "neq.-1"})
-            if delete_response["error"]:
-                logging.error(f"[{env_type}] Error deleting old matches: {delete_response['error']}")
-            else:
-                logging.info(f"[{env_type}] Successfully deleted old matches")
-        except Exception as e:
-            logging.error(f"[{env_type}] Error deleting old matches: {e}")
-
-        # Insert new matches
-        logging.info(f"[{env_type}] Inserting {len(df_for_upload)} new matches...")
-        data_to_insert = df_for_upload.to_dict(orient='records')
-
-        chunk_size = 100
-        total_inserted = 0
-        for i in range(0, len(data_to_insert), chunk_size):
-            chunk = data_to_insert[i:i + chunk_size]
-            try:
-                insert_response = supabase.table("upcoming_matches").insert(chunk)
-                if insert_response["error"] is None:
-                    total_inserted += len(chunk)
-                    logging.info(f"[{env_type}] Chunk {i // chunk_size + 1} inserted ({len(chunk)} matches)")
-                else:
-                    logging.error(f"[{env_type}] Error inserting chunk {i // chunk_size + 1}: {insert_response['error']}")
-            except Exception as e:
-                logging.error(f"[{env_type}] Error inserting chunk {i // chunk_size + 1}: {e}")
+        stats = {"resolved": 0, "kept": 0, "new_names": set()}
+        with metrics.stage("sync"):
+            total_inserted = asyncio.run(sync_upcoming_matches(raw_matches, env_type, stats))
+        metrics.add("matches_unique", stats["resolved"])
+        metrics.add("matches_in_elo", stats["kept"])
+        metrics.add("matches_synced", total_inserted)
 
+        logging.info(f"[{env_type}] ELO filtering: {stats['resolved']} → {stats['kept']} matches (removed {stats['resolved'] - stats['kept']} matches with players not in ELO DB)")
         logging.info(f"=== [{env_type}] PROCESS COMPLETED ===")
         logging.info(f"Raw matches scraped: {len(raw_matches)}")
-        logging.info(f"Unique matches after deduplication: {len(all_matches)}")
-        logging.info(f"Matches inserted to database: {total_inserted}")
-        logging.info(f"Success rate: {total_inserted}/{len(df_for_upload)} matches inserted")
+        logging.info(f"Unique matches after deduplication: {stats['resolved']}")
+        logging.info(f"Matches in database after {UPCOMING_SYNC_MODE} sync: {total_inserted}")
+        logging.info(f"Success rate: {total_inserted}/{stats['kept']} matches synced")
 
     except Exception as e:
         logging.error(f"Error in main function: {e}", exc_info=True)
         raise
+    finally:
+        page_archive.close()
+        metrics.write()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+Per-run metrics of the cron jobs.
+
+Each job keeps one RunMetrics: wall time of its stages (`stage()` blocks
+and `timed()` functions, with the rows they produced), counters (bytes
+fetched, ScraperAPI credits, cards, rows...), per-attempt events and the
+latencies of its Supabase client. At the end of the run `write()` stores
+
+    METRICS_DIR/<job>/<timestamp>.json   summary of the run (last METRICS_HISTORY_RUNS kept)
+    METRICS_DIR/<job>.prom               Prometheus textfile format, overwritten each run
+
+so slow stages can be compared across runs.
+"""
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_DIR = os.getenv("METRICS_DIR", ".cache/metrics")
+METRICS_HISTORY_RUNS = int(os.getenv("METRICS_HISTORY_RUNS", "200"))
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(sorted_values, quantile):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values), max(1, math.ceil(quantile * len(sorted_values)))) - 1
+    return sorted_values[rank]
+
+
+def prometheus_value(value):
+    """Sample value at full precision (integral floats written as integers)"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class RunMetrics:
+    """Metrics of one run of a job (`betclic`, `tennis_abstract`)"""
+    def __init__(self, job, directory=METRICS_DIR):
+        self.job = job
+        self.directory = directory
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0})
+        self.counters = defaultdict(float)
+        self.events = defaultdict(list)
+        self.clients = {}
+
+    def record_stage(self, name, seconds, rows=0):
+        stage = self.stages[name]
+        stage["calls"] += 1
+        stage["seconds"] += seconds
+        stage["max_seconds"] = max(stage["max_seconds"], seconds)
+        stage["rows"] += rows
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def timed(self, name):
+        """
+        Decorator recording the wall time of every call as stage `name`.
+        Works on functions, coroutines and generators (only the time spent
+        producing the items counts); the length of a returned list and the
+        number of yielded items are recorded as the stage rows.
+        """
+        def decorator(func):
+            if inspect.isgeneratorfunction(func):
+                @functools.wraps(func)
+                def generator_wrapper(*args, **kwargs):
+                    seconds = 0.0
+                    rows = 0
+                    iterator = func(*args, **kwargs)
+                    try:
+                        while True:
+                            start = time.perf_counter()
+                            try:
+                                item = next(iterator)
+                            except StopIteration:
+                                return
+                            finally:
+                                seconds += time.perf_counter() - start
+                            rows += 1
+                            yield item
+                    finally:
+                        iterator.close()
+                        self.record_stage(name, seconds, rows)
+                return generator_wrapper
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    result = None
+                    try:
+                        result = await func(*args, **kwargs)
+                        return result
+                    finally:
+                        self.record_stage(name, time.perf_counter() - start, len(result) if isinstance(result, list) else 0)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                result = None
+                try:
+                    result = func(*args, **kwargs)
+                    return result
+                finally:
+                    self.record_stage(name, time.perf_counter() - start, len(result) if isinstance(result, list) else 0)
+            return wrapper
+        return decorator
+
+    def add(self, name, value=1):
+        self.counters[name] += value
+
+    def event(self, name, **fields):
+        """Keep one detailed record (e.g. a ScraperAPI attempt) in the JSON summary"""
+        self.events[name].append(fields)
+
+    def attach_client(self, name, client):
+        """Report the requests, retries and latencies of an AsyncSupabaseClient"""
+        self.clients[name] = client
+
+    def summary(self):
+        clients = {}
+        for name, client in self.clients.items():
+            latencies = {}
+            for request, values in client.latencies.items():
+                values = sorted(values)
+                latencies[request] = {
+                    "count": len(values),
+                    "sum": sum(values),
+                    **{f"p{int(q * 100)}": percentile(values, q) for q in LATENCY_QUANTILES},
+                    "max": values[-1] if values else None,
+                }
+            clients[name] = {"requests": client.requests, "retries": client.retries, "latency_seconds": latencies}
+        return {
+            "job": self.job,
+            "started_at": datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            "duration_seconds": time.perf_counter() - self._started,
+            "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            "counters": dict(self.counters),
+            "clients": clients,
+            "events": dict(self.events),
+        }
+
+    def prometheus(self, summary):
+        labels = f'scraper="{self.job}"'
+        lines = [
+            "# HELP scraper_run_timestamp_seconds Start time of the last run",
+            "# TYPE scraper_run_timestamp_seconds gauge",
+            f"scraper_run_timestamp_seconds{{{labels}}} {self.started_at:.0f}",
+            "# HELP scraper_run_duration_seconds Wall time of the last run",
+            "# TYPE scraper_run_duration_seconds gauge",
+            f"scraper_run_duration_seconds{{{labels}}} {summary['duration_seconds']:.3f}",
+        ]
+        for metric, field, help_text in (
+            ("scraper_stage_seconds", "seconds", "Time spent in each stage during the last run, summed over calls"),
+            ("scraper_stage_max_seconds", "max_seconds", "Longest single call of each stage during the last run"),
+            ("scraper_stage_calls", "calls", "Calls of each stage during the last run"),
+            ("scraper_stage_rows", "rows", "Rows produced by each stage during the last run"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{{labels},stage="{name}"}} {prometheus_value(stage[field])}' for name, stage in summary["stages"].items()]
+        lines += ["# HELP scraper_counter Counters of the last run (bytes, credits, cards, rows...)",
+                  "# TYPE scraper_counter gauge"]
+        lines += [f'scraper_counter{{{labels},name="{name}"}} {prometheus_value(value)}' for name, value in summary["counters"].items()]
+        for metric, field, help_text in (
+            ("scraper_supabase_requests", "requests", "Supabase requests sent during the last run, retries included"),
+            ("scraper_supabase_retries", "retries", "Supabase requests retried during the last run"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{{labels},client="{name}"}} {client[field]}' for name, client in summary["clients"].items()]
+        lines += ["# HELP scraper_supabase_latency_seconds Supabase request latency of the last run",
+                  "# TYPE scraper_supabase_latency_seconds summary"]
+        for name, client in summary["clients"].items():
+            for request, latency in client["latency_seconds"].items():
+                request_labels = f'{labels},client="{name}",request="{request}"'
+                lines += [f'scraper_supabase_latency_seconds{{{request_labels},quantile="{q}"}} {prometheus_value(latency[f"p{int(q * 100)}"])}'
+                          for q in LATENCY_QUANTILES]
+                lines.append(f"scraper_supabase_latency_seconds_sum{{{request_labels}}} {prometheus_value(latency['sum'])}")
+                lines.append(f"scraper_supabase_latency_seconds_count{{{request_labels}}} {latency['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Write the JSON summary and the Prometheus textfile. Returns the summary"""
+        summary = self.summary()
+        if not self.directory:
+            return summary
+        try:
+            run_dir = os.path.join(self.directory, self.job)
+            os.makedirs(run_dir, exist_ok=True)
+            stamp = datetime.fromtimestamp(self.started_at, timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            with open(os.path.join(run_dir, f"{stamp}.json"), "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=1)
+            # Les collecteurs textfile lisent le fichier à tout moment : écriture atomique
+            prom_path = os.path.join(self.directory, f"{self.job}.prom")
+            with open(f"{prom_path}.tmp", "w", encoding="utf-8") as f:
+                f.write(self.prometheus(summary))
+            os.replace(f"{prom_path}.tmp", prom_path)
+            for old_run in sorted(os.listdir(run_dir))[:-METRICS_HISTORY_RUNS]:
+                os.remove(os.path.join(run_dir, old_run))
+        except OSError as e:
+            logging.warning(f"Could not write the {self.job} metrics to {self.directory}: {e}")
+            return summary
+
+        slowest = sorted(summary["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True)[:5]
+        logging.info(f"Metrics written to {self.directory} ({summary['duration_seconds']:.1f}s run); slowest stages: "
+                     + ", ".join(f"{name} {stage['seconds']:.1f}s" for name, stage in slowest))
+        return summary
@@ -0,0 +1,159 @@
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+_NON_LETTERS_RE = re.compile(r"[^a-z\s]")
+
+
+def fold_name(name):
+    """Accent-fold and lowercase a player name, keeping letters and single spaces ("Zverev A." -> "zverev a")"""
+    decomposed = unicodedata.normalize("NFKD", str(name).replace("\xa0", " "))
+    ascii_name = decomposed.encode("ascii", "ignore").decode("ascii").lower()
+    ascii_name = ascii_name.replace("-", " ").replace("'", "")
+    return " ".join(_NON_LETTERS_RE.sub(" ", ascii_name).split())
+
+
+def name_trigrams(folded):
+    """Trigrams of each token padded with spaces, so the token order does not matter"""
+    grams = set()
+    for token in folded.split():
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def token_set_score(query_tokens, candidate_tokens):
+    """
+    Share of tokens that match between the two names, initials-aware:
+    a one-letter token ("a") matches any token starting with that letter
+    at a slightly lower weight than a full token match, and a misspelt
+    token is credited with its similarity when it reaches 0.75.
+    """
+    if not query_tokens or not candidate_tokens:
+        return 0.0
+    remaining = list(candidate_tokens)
+    matched = 0.0
+    for token in sorted(query_tokens, key=len, reverse=True):
+        if token in remaining:
+            remaining.remove(token)
+            matched += 1.0
+        elif len(token) == 1:
+            for other in remaining:
+                if other.startswith(token):
+                    remaining.remove(other)
+                    matched += 0.9
+                    break
+        else:
+            best_other, best_ratio = None, 0.75
+            for other in remaining:
+                if len(other) == 1:
+                    ratio = 0.9 if token.startswith(other) else 0.0
+                else:
+                    ratio = SequenceMatcher(None, token, other).ratio()
+                if ratio >= best_ratio:
+                    best_other, best_ratio = other, ratio
+            if best_other is not None:
+                remaining.remove(best_other)
+                matched += best_ratio
+    return matched / max(len(query_tokens), len(candidate_tokens))
+
+
+class NameMatcher:
+    """
+    Fuzzy matcher for player names.
+
+    Names are accent-folded and indexed by token trigrams. For a query, the
+    trigram posting lists are counted in one numpy pass to get a Dice score
+    for every name sharing a trigram; the best `max_candidates` are then
+    rescored with the pluggable scorers and combined by weight.
+
+    A scorer is `fn(query, candidate_ids, matcher) -> np.ndarray` of scores
+    in [0, 1], registered in `scorers` as {name: (fn, weight)}.
+    """
+    def __init__(self, names, scorers=None, max_candidates=50):
+        self.names = []
+        self.folded = []
+        self.tokens = []
+        postings = defaultdict(list)
+        seen = set()
+        for name in names:
+            folded = fold_name(name)
+            if not folded or folded in seen:
+                continue
+            seen.add(folded)
+            name_id = len(self.names)
+            self.names.append(name)
+            self.folded.append(folded)
+            self.tokens.append(folded.split())
+            for gram in name_trigrams(folded):
+                postings[gram].append(name_id)
+        self.postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.gram_counts = np.asarray([len(name_trigrams(folded)) for folded in self.folded], dtype=np.float32)
+        self.by_folded = {folded: i for i, folded in enumerate(self.folded)}
+        self.scorers = scorers if scorers is not None else dict(DEFAULT_SCORERS)
+        self.max_candidates = max_candidates
+
+    def __len__(self):
+        return len(self.names)
+
+    def _trigram_candidates(self, query_grams):
+        lists = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        candidate_ids = np.flatnonzero(shared)
+        dice = 2.0 * shared[candidate_ids] / (len(query_grams) + self.gram_counts[candidate_ids])
+        if len(candidate_ids) > self.max_candidates:
+            best = np.argpartition(-dice, self.max_candidates)[:self.max_candidates]
+            candidate_ids, dice = candidate_ids[best], dice[best]
+        return candidate_ids, dice.astype(np.float32)
+
+    def top_k(self, name, k=5):
+        """Return up to k (name, score) pairs, best first"""
+        folded = fold_name(name)
+        if not folded:
+            return []
+        if folded in self.by_folded:
+            return [(self.names[self.by_folded[folded]], 1.0)]
+
+        query = {"folded": folded, "tokens": folded.split(), "grams": name_trigrams(folded)}
+        candidate_ids, dice = self._trigram_candidates(query["grams"])
+        if not len(candidate_ids):
+            return []
+        query["dice"] = dice
+
+        total_weight = sum(weight for _, weight in self.scorers.values())
+        scores = np.zeros(len(candidate_ids), dtype=np.float32)
+        for scorer, weight in self.scorers.values():
+            scores += weight * scorer(query, candidate_ids, self)
+        scores /= total_weight
+
+        order = np.argsort(-scores)[:k]
+        return [(self.names[candidate_ids[i]], float(scores[i])) for i in order]
+
+    def best(self, name, threshold):
+        """Return (name, score) of the best match if its score reaches threshold, else (None, score)"""
+        matches = self.top_k(name, k=1)
+        if matches and matches[0][1] >= threshold:
+            return matches[0]
+        return None, matches[0][1] if matches else 0.0
+
+
+def trigram_scorer(query, candidate_ids, matcher):
+    return query["dice"]
+
+
+def token_set_scorer(query, candidate_ids, matcher):
+    return np.fromiter(
+        (token_set_score(query["tokens"], matcher.tokens[i]) for i in candidate_ids),
+        dtype=np.float32, count=len(candidate_ids),
+    )
+
+
+DEFAULT_SCORERS = {
+    "trigram": (trigram_scorer, 0.3),
+    "token_set": (token_set_scorer, 0.7),
+}
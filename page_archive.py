@@ -0,0 +1,191 @@
+"""
+Compressed archive of the raw pages fetched by the scrapers.
+
+Pages are stored gzip-compressed under their sha256 (identical pages are
+stored once) in PAGE_ARCHIVE_DIR/<kind>/, with an index.jsonl listing every
+fetch (url, time, hash). Writes happen on a background thread so they never
+sit on the scraping path, and entries older than the retention are pruned
+when the archive is closed.
+
+    python page_archive.py replay [--kind betclic|tennis_abstract] [--since-days N] [--limit N]
+
+re-runs the extraction offline over the archived pages, without any fetch.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PAGE_ARCHIVE_DIR = os.getenv("PAGE_ARCHIVE_DIR", ".cache/pages")
+PAGE_ARCHIVE_RETENTION_DAYS = float(os.getenv("PAGE_ARCHIVE_RETENTION_DAYS", "14"))
+ARCHIVE_KINDS = ("betclic", "tennis_abstract")
+
+
+class PageArchive:
+    """Content-addressed page store for one kind of page (one writer process per kind)"""
+    def __init__(self, kind, root=PAGE_ARCHIVE_DIR, retention_days=PAGE_ARCHIVE_RETENTION_DAYS):
+        self.kind = kind
+        self.enabled = bool(root)
+        self.directory = os.path.join(root, kind) if root else ""
+        self.index_path = os.path.join(self.directory, "index.jsonl")
+        self.retention = retention_days * 86400
+        self._executor = None
+        self.stored = 0
+        self.deduplicated = 0
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.directory, "blobs", content_hash[:2], f"{content_hash}.html.gz")
+
+    def store(self, url, content):
+        """Queue a page (str or bytes) for archiving and return its sha256 immediately"""
+        if not self.enabled:
+            return None
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        content_hash = hashlib.sha256(content).hexdigest()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"archive-{self.kind}")
+        self._executor.submit(self._write, url, content, content_hash, time.time())
+        return content_hash
+
+    def _write(self, url, content, content_hash, fetched_at):
+        try:
+            blob_path = self._blob_path(content_hash)
+            if os.path.exists(blob_path):
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                tmp_path = f"{blob_path}.tmp"
+                with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+                    f.write(content)
+                os.replace(tmp_path, blob_path)
+                self.stored += 1
+            entry = {"url": url, "sha256": content_hash, "fetched_at": fetched_at, "size": len(content)}
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logging.warning(f"Could not archive {url}: {e}")
+
+    def entries(self, since=None):
+        """Index entries, oldest first, optionally only those fetched after `since` (timestamp)"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if since is None or entry["fetched_at"] >= since:
+                entries.append(entry)
+        return entries
+
+    def read(self, content_hash):
+        with gzip.open(self._blob_path(content_hash), "rb") as f:
+            return f.read()
+
+    def prune(self):
+        """Drop index entries older than the retention and the blobs no longer referenced"""
+        cutoff = time.time() - self.retention
+        kept = self.entries(since=cutoff)
+        referenced = {entry["sha256"] for entry in kept}
+        removed = 0
+        blobs_dir = os.path.join(self.directory, "blobs")
+        for dirpath, _, filenames in os.walk(blobs_dir, topdown=False):
+            for filename in filenames:
+                if filename.split(".", 1)[0] not in referenced:
+                    os.remove(os.path.join(dirpath, filename))
+                    removed += 1
+            if dirpath != blobs_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        if os.path.exists(self.index_path):
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in kept)
+            os.replace(tmp_path, self.index_path)
+        return removed
+
+    def close(self):
+        """Wait for the pending writes, then apply the retention policy"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if not self.enabled:
+            return
+        try:
+            removed = self.prune()
+        except OSError as e:
+            logging.warning(f"Could not prune the {self.kind} page archive: {e}")
+            return
+        logging.info(f"Page archive ({self.kind}): {self.stored} pages stored, {self.deduplicated} already archived, "
+                     f"{removed} expired pages removed")
+
+
+def replay_betclic(archive, entries):
+    import betclic_scraper_render_optimized as betclic
+
+    totals = {"json": 0, "html": 0, "unique": 0}
+    for entry in entries:
+        page_content = archive.read(entry["sha256"]).decode("utf-8")
+        scripts, cards = betclic.parse_betclic_page(page_content)
+        json_matches = list(betclic.extract_json_matches(scripts))
+        html_matches = betclic.extract_html_matches(cards)
+        unique = betclic.deduplicate_matches(json_matches + html_matches)
+        totals["json"] += len(json_matches)
+        totals["html"] += len(html_matches)
+        totals["unique"] += len(unique)
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['fetched_at']))}  {entry['sha256'][:12]}  "
+              f"cards={len(cards)} json={len(json_matches)} html={len(html_matches)} unique={len(unique)}")
+    print(f"{len(entries)} pages: {totals['json']} JSON matches, {totals['html']} HTML matches, {totals['unique']} unique")
+
+
+def replay_tennis_abstract(archive, entries):
+    import player_stats_scraper as player_stats
+
+    total_tables = 0
+    for entry in entries:
+        parsed = player_stats.parse_player_page(archive.read(entry["sha256"]), entry["url"])
+        total_tables += len(parsed)
+        rows = sum(len(table_rows) for _, table_rows in parsed.values())
+        print(f"{entry['url']}  {entry['sha256'][:12]}  tables={len(parsed)} rows={rows}")
+    print(f"{len(entries)} pages: {total_tables} tables")
+
+
+REPLAYERS = {"betclic": replay_betclic, "tennis_abstract": replay_tennis_abstract}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Archived scraper pages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay = subparsers.add_parser("replay", help="Re-run the extraction offline over archived pages")
+    replay.add_argument("--kind", choices=ARCHIVE_KINDS, default="betclic")
+    replay.add_argument("--since-days", type=float, help="Only pages fetched in the last N days")
+    replay.add_argument("--limit", type=int, help="Only the N most recent pages")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    archive = PageArchive(args.kind)
+    since = time.time() - args.since_days * 86400 if args.since_days else None
+    entries = archive.entries(since)
+    if args.limit:
+        entries = entries[-args.limit:]
+    if not entries:
+        logging.error(f"No archived {args.kind} page in {archive.directory}")
+        return 1
+    REPLAYERS[args.kind](archive, entries)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(main())
@@ -10,26 +10,42 @@ import os
 import json
 import httpx
 from dotenv import load_dotenv
+from supabase_client import AsyncSupabaseClient, SupabaseError
+from page_archive import PageArchive
+from metrics import RunMetrics
+from name_matching import fold_name
 import re
 import csv
 import logging
+import queue
+import threading
+import asyncio
+import argparse
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Chargement des URLs depuis le CSV
-urls_to_scrape = []
-try:
-    with open('atp_elo_ratings_rows.csv', 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader, None)  # saute l'en-tête
-        for row in reader:
-            if row and row[0].startswith("http"):
-                urls_to_scrape.append(row[0])
-    logging.info(f"Loaded {len(urls_to_scrape)} player URLs to scrape")
-except Exception as e:
-    logging.error(f"Error loading CSV file: {e}")
+def load_player_urls(csv_path='atp_elo_ratings_rows.csv'):
     urls_to_scrape = []
+    try:
+        with open(csv_path, 'r') as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)  # saute l'en-tête
+            for row in reader:
+                if row and row[0].startswith("http"):
+                    urls_to_scrape.append(row[0])
+        logging.info(f"Loaded {len(urls_to_scrape)} player URLs to scrape")
+    except Exception as e:
+        logging.error(f"Error loading CSV file: {e}")
+        urls_to_scrape = []
+    return urls_to_scrape
 
 def normalize_column(col):
     # Enlève espaces, met tout en minuscule, garde lettres/chiffres/_ et %
@@ -39,100 +55,69 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    logging.critical("SUPABASE_URL and SUPABASE_KEY environment variables are not set or empty.")
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set for the script to run.")
-
-# Define a minimal Supabase client class that uses httpx directly
-class MinimalSupabaseClient:
-    def __init__(self, url, key):
-        self.url = url.rstrip('/')
-        self.key = key
-        self.rest_url = f"{self.url}/rest/v1"
-        self.headers = {
-            "apikey": self.key,
-            "Authorization": f"Bearer {self.key}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-        
-    def table(self, table_name):
-        return MinimalSupabaseTable(self, table_name)
-        
-    def request(self, method, url, **kwargs):
-        # Merge headers
-        headers = {**self.headers, **kwargs.get('headers', {})}
-        kwargs['headers'] = headers
-        
-        # Make request with httpx
-        with httpx.Client(timeout=30.0) as client:
-            response = client.request(method, url, **kwargs)
-            
-        # Check for errors
-        if response.status_code >= 400:
-            logging.error(f"Supabase API error: {response.status_code} - {response.text}")
-            response.raise_for_status()
-            
-        return response.json()
-        
-class MinimalSupabaseTable:
-    def __init__(self, client, table_name):
+SUPABASE_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "8"))
+
+def is_unknown_column_error(error):
+    """PGRST204: column missing from PostgREST's schema cache, 42703: undefined column"""
+    return isinstance(error, SupabaseError) and error.code in ("PGRST204", "42703")
+
+class SchemaRegistry:
+    """
+    Process-wide cache of the columns of each Supabase table, normalized with
+    normalize_column. Loaded once from the PostgREST OpenAPI description
+    (a one-row probe is used for tables missing from it) and only reloaded
+    after a write fails on an unknown column.
+    """
+    def __init__(self, client):
         self.client = client
-        self.table_name = table_name
-        self.url = f"{client.rest_url}/{table_name}"
-        self.current_query = {}
-        
-    def select(self, columns="*"):
-        self.current_query['select'] = columns
-        return self
-        
-    def eq(self, column, value):
-        self.current_query[column] = f"eq.{value}"
-        return self
-        
-    def limit(self, count):
-        self.current_query["limit"] = count
-        return self
-        
-    def execute(self):
-        # Build query params
-        params = {}
-        if 'select' in self.current_query:
-            params['select'] = self.current_query.pop('select')
-            
-        # Add other filters
-        for key, value in self.current_query.items():
-            params[key] = value
-            
-        # Reset current query
-        self.current_query = {}
-        
-        # Make request
+        self._columns = {}
+        self._openapi_loaded = False
+        self._lock = asyncio.Lock()
+
+    async def _load_openapi(self):
         try:
-            result = self.client.request('GET', self.url, params=params)
-            return SupabaseResponse(result)
+            spec = await self.client.openapi()
+            definitions = spec.get("definitions", {})
+            for table_name, definition in definitions.items():
+                self._columns[table_name] = {normalize_column(col) for col in definition.get("properties", {})}
+            logging.info(f"Loaded columns of {len(definitions)} tables from the PostgREST OpenAPI description")
         except Exception as e:
-            logging.error(f"Error executing query: {e}")
-            return SupabaseResponse([])
-            
-    def insert(self, data):
+            logging.warning(f"Could not load the PostgREST OpenAPI description, probing tables instead: {e}")
+
+    async def _probe(self, table_name):
         try:
-            result = self.client.request('POST', self.url, json=data)
-            return SupabaseResponse(result)
-        except Exception as e:
-            logging.error(f"Error inserting data: {e}")
-            return SupabaseResponse([])
-            
-    def delete(self):
-        return self
-        
-class SupabaseResponse:
-    def __init__(self, data):
-        self.data = data
+            rows, _ = await self.client.select_page(table_name, limit=1)
+        except SupabaseError as e:
+            logging.error(f"Error probing columns of {table_name}: {e}")
+            return None
+        if not rows:
+            return None
+        return {normalize_column(col) for col in rows[0].keys()}
+
+    async def columns(self, table_name):
+        """Normalized column names of a table, or None if they cannot be known (empty table)"""
+        async with self._lock:
+            if not self._openapi_loaded:
+                self._openapi_loaded = True
+                await self._load_openapi()
+            if table_name not in self._columns:
+                # None (table vide) est aussi gardé : le probe n'est fait qu'une fois
+                self._columns[table_name] = await self._probe(table_name)
+            return self._columns[table_name]
+
+    async def invalidate(self, table_name):
+        async with self._lock:
+            logging.info(f"Schema of {table_name} changed, reloading its columns")
+            self._columns.pop(table_name, None)
+            self._openapi_loaded = False
 
-# Use our minimal implementation directly
-logging.info("Using minimal Supabase client implementation...")
-supabase = MinimalSupabaseClient(SUPABASE_URL, SUPABASE_KEY)
+# Client async partagé avec le scraper Betclic
+supabase = AsyncSupabaseClient(SUPABASE_URL or "", SUPABASE_KEY or "", max_concurrency=SUPABASE_MAX_CONCURRENCY)
+schema_registry = SchemaRegistry(supabase)
+
+# Métriques du run (temps par étape, octets, lignes, latences Supabase), voir metrics.py
+metrics = RunMetrics("tennis_abstract")
+metrics.attach_client("supabase", supabase)
 
 def clean_nbsp(text):
     return text.replace('\xa0', ' ')
@@ -147,30 +132,278 @@ tables = {
     "winners_errors": "winners-errors"
 }
 
-# Fonction d'insertion dans supabase
-def insert_df(table_name, df):
-    try:
-        # Récupère dynamiquement les colonnes de la table sur Supabase
-        resp = supabase.table(table_name).select("*").limit(1).execute()
-        if not resp.data:
-            # Si la table est vide, on prend les clés du DataFrame actuel
-            table_columns = set(normalize_column(col) for col in df.columns)
+# Ne garde que les colonnes du DataFrame qui existent dans la table Supabase, normalisées
+async def prepare_records(table_name, df):
+    # Colonnes de la table, chargées une seule fois par run
+    table_columns = await schema_registry.columns(table_name)
+    if table_columns is None:
+        # Si la table est vide, on prend les clés du DataFrame actuel
+        table_columns = set(normalize_column(col) for col in df.columns)
+    # Ne garde que les colonnes qui existent en base
+    filtered_cols = [col for col in df.columns if normalize_column(col) in table_columns]
+    filtered_df = df[filtered_cols]
+    # Renommer les colonnes du DataFrame pour qu'elles correspondent à la normalisation
+    filtered_df.columns = [normalize_column(col) for col in filtered_df.columns]
+    return filtered_df.to_dict(orient='records')
+
+# Fonction d'insertion dans supabase, renvoie True si toutes les lignes ont été insérées
+@metrics.timed("insert_df")
+async def insert_df(table_name, df):
+    for attempt in range(2):
+        try:
+            data = await prepare_records(table_name, df)
+            await supabase.insert(table_name, data, chunk_size=100)
+            logging.info(f"Successfully inserted {len(data)} rows into {table_name}")
+            return True
+        except Exception as e:
+            if attempt == 0 and is_unknown_column_error(e):
+                await schema_registry.invalidate(table_name)
+                continue
+            logging.error(f"Error inserting data into {table_name}: {e}")
+            return False
+
+# Clé naturelle des lignes de chaque table, en plus de player_slug.
+# Les tables absentes d'ici utilisent leur première colonne de données.
+# Chaque table doit avoir un index unique sur (player_slug, <clé>) pour l'upsert.
+NATURAL_KEYS = {
+    # date est celle du tournoi : l'adversaire distingue les matchs de poule (RR) d'un même tournoi
+    "recent_results": ("date", "tournament", "rd", "opponent"),
+}
+# Code PostgreSQL de l'upsert quand aucun index unique ne correspond à on_conflict
+NO_UNIQUE_INDEX_CODE = "42P10"
+# Colonnes ignorées pour décider si une ligne a changé
+SYNC_IGNORED_COLUMNS = {"id", "scraped_at"}
+DELETE_CHUNK_SIZE = 50
+
+def natural_key_columns(table_name, records):
+    key_columns = NATURAL_KEYS.get(table_name)
+    if key_columns is None:
+        key_columns = [col for col in records[0] if col not in ("player_slug", "scraped_at")][:1]
+    key_columns = ("player_slug",) + tuple(key_columns)
+    if len(key_columns) > 1 and all(col in records[0] for col in key_columns):
+        return key_columns
+    return None
+
+def comparable(value):
+    return "" if value is None else str(value)
+
+def row_key(row, key_columns):
+    return tuple(comparable(row.get(col)) for col in key_columns)
+
+def pgrst_filter(column, value):
+    """Build a PostgREST logical-tree filter with the value quoted for reserved characters"""
+    if value is None:
+        return f"{column}.is.null"
+    quoted = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'{column}.eq."{quoted}"'
+
+# Regroupement des upserts de plusieurs joueurs par table
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "500"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "5"))
+
+class WriteBuffer:
+    """
+    Merges upserted rows for the same table across players into larger
+    batches, flushed once WRITE_BATCH_SIZE rows are waiting or the oldest
+    row is WRITE_FLUSH_INTERVAL seconds old. Rows are grouped by column set
+    because PostgREST requires every object of a bulk insert to share keys.
+    The players of a batch that failed are kept in failed_players, and
+    `when_flushed` runs a callback once all of a player's rows are written.
+    A table without the unique index on the natural key (42P10) is kept in
+    tables_without_index and each player of the batch is rewritten by
+    delete + insert of all its rows.
+    """
+    def __init__(self, client, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._batches = {}
+        self.failed_players = set()
+        self.tables_without_index = set()
+        self.rows_written = 0
+        self._rewritten = set()
+        # Lots pas encore écrits contenant des lignes de chaque joueur
+        self._pending = defaultdict(int)
+        self._on_flushed = {}
+
+    def when_flushed(self, player_slug, callback):
+        """Call `callback` once every buffered row of this player is written (never if a batch failed)"""
+        if player_slug in self.failed_players:
+            return
+        if self._pending[player_slug]:
+            self._on_flushed[player_slug] = callback
         else:
-            table_columns = set(normalize_column(col) for col in resp.data[0].keys())
-        # Ne garde que les colonnes qui existent en base
-        filtered_cols = [col for col in df.columns if normalize_column(col) in table_columns]
-        filtered_df = df[filtered_cols]
-        # Renommer les colonnes du DataFrame pour qu'elles correspondent à la normalisation
-        filtered_df.columns = [normalize_column(col) for col in filtered_df.columns]
-        data = filtered_df.to_dict(orient='records')
-        for chunk_start in range(0, len(data), 100):
-            chunk = data[chunk_start:chunk_start+100]
-            supabase.table(table_name).insert(chunk).execute()
-        logging.info(f"Successfully inserted {len(data)} rows into {table_name}")
-    except Exception as e:
-        logging.error(f"Error inserting data into {table_name}: {e}")
+            callback()
+
+    async def add(self, table_name, rows, on_conflict, player_slug, records):
+        """Queue `rows` for upsert; `records` are all of the player's rows, rewritten if the table has no unique index"""
+        ready = []
+        for row in rows:
+            batch_key = (table_name, on_conflict, tuple(row))
+            batch = self._batches.get(batch_key)
+            if batch is None:
+                batch = self._batches[batch_key] = {"rows": [], "players": {}, "since": time.monotonic()}
+            batch["rows"].append(row)
+            if player_slug not in batch["players"]:
+                batch["players"][player_slug] = records
+                self._pending[player_slug] += 1
+            if len(batch["rows"]) >= self.batch_size:
+                ready.append((batch_key, self._batches.pop(batch_key)))
+        await self._write_all(ready)
+
+    async def flush_due(self):
+        """Flush the batches whose oldest row waited longer than flush_interval"""
+        now = time.monotonic()
+        due = [key for key, batch in self._batches.items() if now - batch["since"] >= self.flush_interval]
+        await self._write_all([(key, self._batches.pop(key)) for key in due])
+
+    async def flush_all(self):
+        ready = list(self._batches.items())
+        self._batches = {}
+        await self._write_all(ready)
+
+    async def _write_all(self, ready):
+        await asyncio.gather(*[self._write(batch_key, batch) for batch_key, batch in ready])
+
+    async def _write(self, batch_key, batch):
+        table_name, on_conflict, _ = batch_key
+        key_columns = on_conflict.split(",")
+        # Dernière version de chaque ligne si un joueur apparaît deux fois
+        rows = list({tuple(comparable(row.get(col)) for col in key_columns): row for row in batch["rows"]}.values())
+        for attempt in range(2):
+            try:
+                await self.client.upsert(table_name, rows, on_conflict=on_conflict, chunk_size=self.batch_size)
+                self.rows_written += len(rows)
+                logging.info(f"Upserted {len(rows)} rows into {table_name} for {len(batch['players'])} players")
+                self._batch_done(batch["players"])
+                return
+            except Exception as e:
+                if attempt == 0 and is_unknown_column_error(e):
+                    await schema_registry.invalidate(table_name)
+                    table_columns = await schema_registry.columns(table_name)
+                    if table_columns is not None:
+                        rows = [{col: value for col, value in row.items() if col in table_columns} for row in rows]
+                    continue
+                if isinstance(e, SupabaseError) and e.code == NO_UNIQUE_INDEX_CODE:
+                    if table_name not in self.tables_without_index:
+                        self.tables_without_index.add(table_name)
+                        logging.warning(f"No unique index on ({on_conflict}) for {table_name}, "
+                                        f"falling back to delete + insert (see README)")
+                    await asyncio.gather(*[self._rewrite(table_name, player_slug, records)
+                                           for player_slug, records in batch["players"].items()])
+                    self._batch_done(batch["players"])
+                    return
+                logging.error(f"Error upserting {len(rows)} rows into {table_name}: {e}")
+                break
+        self.failed_players.update(batch["players"])
+        self._batch_done(batch["players"])
+
+    async def _rewrite(self, table_name, player_slug, records):
+        # Une seule réécriture par joueur et table, même si ses lignes étaient dans plusieurs lots
+        if (table_name, player_slug) in self._rewritten:
+            return
+        self._rewritten.add((table_name, player_slug))
+        try:
+            await self.client.delete(table_name, {"player_slug": f"eq.{player_slug}"})
+            await self.client.insert(table_name, records, chunk_size=100)
+            self.rows_written += len(records)
+            logging.info(f"Rewrote {len(records)} rows of {table_name} for {player_slug}")
+        except Exception as e:
+            logging.error(f"Error rewriting {table_name} for {player_slug}: {e}")
+            self.failed_players.add(player_slug)
+
+    def _batch_done(self, players):
+        for player_slug in players:
+            self._pending[player_slug] -= 1
+            if self._pending[player_slug] == 0:
+                del self._pending[player_slug]
+                callback = self._on_flushed.pop(player_slug, None)
+                if callback is not None and player_slug not in self.failed_players:
+                    callback()
+
+write_buffer = WriteBuffer(supabase)
+
+async def sync_records(table_name, records, key_columns, player_slug):
+    """Diff one player's records, delete the gone rows and queue the upserts. Returns (upserted, deleted)"""
+    # Clés uniques, vérifié par sync_df
+    new_rows = {row_key(row, key_columns): row for row in records}
+    existing = await supabase.select(table_name, filters={"player_slug": f"eq.{player_slug}"})
+    existing_rows = {row_key(row, key_columns): row for row in existing}
+
+    compare_columns = [col for col in records[0] if col not in SYNC_IGNORED_COLUMNS]
+    to_upsert = [
+        row for key, row in new_rows.items()
+        if key not in existing_rows
+        or any(comparable(row.get(col)) != comparable(existing_rows[key].get(col)) for col in compare_columns)
+    ]
+    gone = [existing_rows[key] for key in existing_rows if key not in new_rows]
+
+    if to_upsert:
+        await write_buffer.add(table_name, to_upsert, ",".join(key_columns), player_slug, records)
+
+    deletes = []
+    for chunk_start in range(0, len(gone), DELETE_CHUNK_SIZE):
+        chunk = gone[chunk_start:chunk_start+DELETE_CHUNK_SIZE]
+        row_filters = ",".join(
+            "and({})".format(",".join(pgrst_filter(col, row.get(col)) for col in key_columns[1:]))
+            for row in chunk
+        )
+        deletes.append(supabase.delete(table_name, {"player_slug": f"eq.{player_slug}", "or": f"({row_filters})"}))
+    await asyncio.gather(*deletes)
 
-def create_chrome_driver():
+    return len(to_upsert), len(gone)
+
+@metrics.timed("sync_df")
+async def sync_df(table_name, df, player_slug):
+    """
+    Sync one player's rows of a table: upsert new or changed rows on the
+    natural key and delete only the rows that are gone. Returns True on success.
+    """
+    for attempt in range(2):
+        try:
+            records = await prepare_records(table_name, df)
+            if not records:
+                return True
+            key_columns = natural_key_columns(table_name, records)
+            if key_columns is None:
+                logging.warning(f"No natural key columns for {table_name}, falling back to delete + insert")
+            elif len({row_key(row, key_columns) for row in records}) < len(records):
+                # Plusieurs lignes sur la même clé : l'upsert en perdrait, on réécrit tout
+                logging.warning(f"Natural key {key_columns} of {table_name} is not unique for {player_slug}, "
+                                f"falling back to delete + insert")
+                key_columns = None
+            elif table_name in write_buffer.tables_without_index:
+                # Upsert refusé plus tôt dans le run (42P10), déjà signalé par WriteBuffer
+                key_columns = None
+            if key_columns is None:
+                await supabase.delete(table_name, {"player_slug": f"eq.{player_slug}"})
+                return await insert_df(table_name, df)
+
+            upserted, deleted = await sync_records(table_name, records, key_columns, player_slug)
+            logging.info(f"Synced {table_name} for {player_slug}: {upserted} queued for upsert, "
+                         f"{deleted} deleted, {len(records) - upserted} unchanged")
+            return True
+        except Exception as e:
+            if attempt == 0 and is_unknown_column_error(e):
+                await schema_registry.invalidate(table_name)
+                continue
+            logging.error(f"Error syncing {table_name} for {player_slug}: {e}")
+            return False
+
+# Taille du pool de drivers Chrome et recyclage
+CHROME_POOL_SIZE = int(os.getenv("CHROME_POOL_SIZE", "1"))
+CHROME_MAX_PAGES_PER_DRIVER = int(os.getenv("CHROME_MAX_PAGES_PER_DRIVER", "50"))
+
+_chromedriver_path = None
+
+def get_chromedriver_path():
+    """Resolve the chromedriver binary once per process"""
+    global _chromedriver_path
+    if _chromedriver_path is None:
+        _chromedriver_path = ChromeDriverManager().install()
+    return _chromedriver_path
+
+def create_chrome_driver(debug_port=9222):
     """Create Chrome driver optimized for Render environment"""
     chrome_options = Options()
     chrome_options.add_argument("--headless")
@@ -188,13 +421,13 @@ def create_chrome_driver():
     is_render = 'RENDER' in os.environ
     if is_render:
         logging.info("Running on Render - using optimized Chrome options")
-        chrome_options.add_argument("--remote-debugging-port=9222")
+        chrome_options.add_argument(f"--remote-debugging-port={debug_port}")
         chrome_options.add_argument("--disable-background-timer-throttling")
         chrome_options.add_argument("--disable-renderer-backgrounding")
         chrome_options.add_argument("--disable-backgrounding-occluded-windows")
 
     try:
-        service = Service(ChromeDriverManager().install())
+        service = Service(get_chromedriver_path())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.set_page_load_timeout(30)  # 30 second timeout
         return driver
@@ -202,105 +435,608 @@ def create_chrome_driver():
         logging.error(f"Failed to create Chrome driver: {e}")
         raise
 
-# Main scraping loop
-successful_scrapes = 0
-failed_scrapes = 0
+class ChromeDriverPool:
+    """
+    Pool of long-lived Chrome drivers handed out one page at a time.
+    Drivers are health-checked on checkout and recycled after max_pages
+    pages or as soon as a page load fails.
+    """
+    def __init__(self, size=CHROME_POOL_SIZE, max_pages=CHROME_MAX_PAGES_PER_DRIVER):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.Semaphore(self.size)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._ports = {}
+        self._free_ports = [9222 + i for i in range(self.size)]
+        self.drivers_created = 0
+        self.drivers_recycled = 0
+
+    def _create(self):
+        with self._lock:
+            port = self._free_ports.pop()
+        try:
+            driver = create_chrome_driver(debug_port=port)
+        except Exception:
+            with self._lock:
+                self._free_ports.append(port)
+            raise
+        with self._lock:
+            self._pages[driver] = 0
+            self._ports[driver] = port
+            self.drivers_created += 1
+        return driver
 
-logging.info(f"Starting to scrape {len(urls_to_scrape)} player URLs...")
+    def _discard(self, driver, recycled=True):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            self._pages.pop(driver, None)
+            self._free_ports.append(self._ports.pop(driver))
+            if recycled:
+                self.drivers_recycled += 1
 
-for i, player_url in enumerate(urls_to_scrape):
-    try:
-        logging.info(f"Processing player {i+1}/{len(urls_to_scrape)}: {player_url}")
-        
-        driver = create_chrome_driver()
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                return self._create()
+            if self._is_healthy(driver):
+                return driver
+            logging.warning("Chrome driver failed health check, recycling it")
+            self._discard(driver)
+
+    def _checkin(self, driver):
+        with self._lock:
+            self._pages[driver] += 1
+            exhausted = self._pages[driver] >= self.max_pages
+        if exhausted:
+            logging.info(f"Chrome driver served {self.max_pages} pages, recycling it")
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def driver(self):
+        """Borrow a driver for a single page; it is recycled if the page fails"""
+        self._slots.acquire()
+        try:
+            driver = self._checkout()
+            try:
+                yield driver
+            except Exception:
+                self._discard(driver)
+                raise
+            self._checkin(driver)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver, recycled=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Parallélisme du pipeline et limite de débit vers Tennis Abstract
+PLAYER_FETCH_CONCURRENCY = int(os.getenv("PLAYER_FETCH_CONCURRENCY", "8"))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+DEFAULT_PARSE_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_HTML_PARSER = "lxml"
+HTML_PARSERS = ("lxml", "html.parser")
+TENNIS_ABSTRACT_RATE = float(os.getenv("TENNIS_ABSTRACT_RATE", "2"))  # requêtes par seconde
+TENNIS_ABSTRACT_BURST = int(os.getenv("TENNIS_ABSTRACT_BURST", "4"))
+
+# En-têtes HTTP pour Tennis Abstract : les tables sont servies en HTML statique
+TENNIS_ABSTRACT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Repère les ids des tables attendues (et leurs variantes '-chall') dans le HTML brut
+EXPECTED_TABLES_RE = re.compile(
+    rb"""<table[^>]*\bid=["']?(?:%s)""" % b"|".join(re.escape(table_id).encode() for table_id in tables.values()),
+    re.IGNORECASE,
+)
+
+class TokenBucket:
+    """Asyncio token bucket: `rate` requests per second with bursts up to `capacity`"""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class HostRateLimiter:
+    """One token bucket per host, created on first use"""
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+
+    async def acquire(self, url):
+        host = urlparse(url).hostname or ""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.capacity)
+        await bucket.acquire()
+
+# Cache disque des pages joueurs entre deux runs
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", ".cache/player_pages.json")
+
+class PageCache:
+    """
+    On-disk cache keyed by player URL. Stores the response validators
+    (ETag / Last-Modified), a hash of the raw page and a hash of each
+    extracted table, so unchanged pages and tables can be skipped.
+    Entries are only committed once the matching rows are in Supabase.
+    """
+    def __init__(self, path=PAGE_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.hits = {"not_modified": 0, "unchanged_page": 0, "unchanged_table": 0}
+        self.misses = {"page": 0, "table": 0}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+            logging.info(f"Loaded page cache with {len(self.entries)} players from {self.path}")
+        except Exception as e:
+            logging.warning(f"Could not read page cache {self.path}, starting empty: {e}")
+            self.entries = {}
+        return self
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            logging.info(f"Saved page cache with {len(self.entries)} players to {self.path}")
+        except Exception as e:
+            logging.error(f"Could not write page cache {self.path}: {e}")
+
+    def conditional_headers(self, url):
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def page_unchanged(self, url, content_hash):
+        if self.entries.get(url, {}).get("content_hash") == content_hash:
+            self.hits["unchanged_page"] += 1
+            return True
+        self.misses["page"] += 1
+        return False
+
+    def table_unchanged(self, url, key, table_hash):
+        if self.entries.get(url, {}).get("tables", {}).get(key) == table_hash:
+            self.hits["unchanged_table"] += 1
+            return True
+        self.misses["table"] += 1
+        return False
+
+    def commit_table(self, url, key, table_hash):
+        self.entries.setdefault(url, {}).setdefault("tables", {})[key] = table_hash
+
+    def commit_page(self, url, page_meta):
+        entry = self.entries.setdefault(url, {})
+        entry.update(page_meta)
+
+    def forget(self, url):
+        self.entries.pop(url, None)
+
+def hash_page(page_bytes):
+    return hashlib.sha256(page_bytes).hexdigest()
+
+def hash_table(headers, rows):
+    return hashlib.sha256(json.dumps([headers, rows]).encode("utf-8")).hexdigest()
+
+def has_expected_tables(page_bytes):
+    """Check whether the raw page contains at least one of the stat tables we parse"""
+    return EXPECTED_TABLES_RE.search(page_bytes) is not None
+
+async def fetch_player_page_http(client, player_url, headers=None):
+    """
+    Fetch a player page with a single plain HTTP request.
+    Returns: (raw page bytes or None when the server answered 304, validators)
+    """
+    response = await client.get(player_url, headers=headers)
+    if response.status_code == 304:
+        return None, {}
+    response.raise_for_status()
+    validators = {
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+    return response.content, validators
+
+def fetch_player_page_selenium(driver_pool, player_url):
+    """Fetch a player page with a pooled Chrome driver"""
+    with driver_pool.driver() as driver:
         driver.get(player_url)
         time.sleep(3)  # Wait for content to load
+        return driver.page_source.encode("utf-8")
 
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        driver.quit()
+@metrics.timed("fetch_player_page")
+async def fetch_player_page(client, rate_limiter, driver_pool, player_url, conditional_headers=None):
+    """
+    Fetch a player page over plain HTTP first and only fall back to Chrome
+    when the expected tables are missing from the response.
+    Returns: (raw page bytes or None if not modified, validators, method)
+    """
+    try:
+        await rate_limiter.acquire(player_url)
+        html, validators = await fetch_player_page_http(client, player_url, conditional_headers)
+        if html is None:
+            return None, validators, "http"
+        if has_expected_tables(html):
+            return html, validators, "http"
+        logging.info(f"No stat tables in HTTP response for {player_url}, falling back to Chrome")
+    except httpx.HTTPError as e:
+        logging.warning(f"HTTP fetch failed for {player_url}: {e}, falling back to Chrome")
+    await rate_limiter.acquire(player_url)
+    html = await asyncio.to_thread(fetch_player_page_selenium, driver_pool, player_url)
+    return html, {}, "selenium"
 
-        scraped_at = datetime.date.today().isoformat()
-        player_processed = False
+def make_columns_unique(cols):
+    counts = {}
+    result = []
+    for c in cols:
+        if c in counts:
+            counts[c] += 1
+            result.append(f"{c}_{counts[c]}")
+        else:
+            counts[c] = 0
+            result.append(c)
+    return result
 
-        for key, table_id in tables.items():
-            try:
-                table = soup.find("table", id=table_id)
-                # Si la table n'est pas trouvée et que l'id se termine par '-splits', on tente avec l'id alternatif
-                if not table and table_id.endswith("-splits"):
-                    alt_id = f"{table_id}-chall"
-                    table_alt = soup.find("table", id=alt_id)
-                    if table_alt:
-                        logging.info(f"Table {table_id} not found, using alternative {alt_id}")
-                        table = table_alt
-                        
-                if not table:
-                    logging.warning(f"Table {table_id} not found for {player_url}")
-                    continue
-                    
-                headers = [clean_nbsp(th.get_text(" ", strip=True)) for th in table.find("thead").find_all("th")]
-                rows = []
-                for tr in table.find("tbody").find_all("tr"):
-                    cells = [clean_nbsp(td.get_text(" ", strip=True)) for td in tr.find_all("td")]
-                    if cells:
-                        rows.append(cells)
-                        
-                if not rows:
-                    logging.warning(f"No data rows found in table {table_id} for {player_url}")
-                    continue
-                    
-                df = pd.DataFrame(rows, columns=headers)
-                
-                def make_columns_unique(cols):
-                    counts = {}
-                    result = []
-                    for c in cols:
-                        if c in counts:
-                            counts[c] += 1
-                            result.append(f"{c}_{counts[c]}")
-                        else:
-                            counts[c] = 0
-                            result.append(c)
-                    return result
-
-                df.columns = make_columns_unique(df.columns)
-                # Remove empty or anonymous columns
-                df = df.loc[:, df.columns != '']
-                df.columns = [col.lower() for col in df.columns]
-                df['scraped_at'] = scraped_at
-                df['player_slug'] = player_url
-                
-                logging.info(f"Table {key}: {len(df)} rows found")
-                
-                # Delete old data for this player
-                supabase.table(key).delete().eq('player_slug', player_url).execute()
-                
-                # Insert new data
-                insert_df(key, df)
-                player_processed = True
-                
-            except Exception as e:
-                logging.error(f"Error processing table {key} for {player_url}: {e}")
+def find_stat_table(soup, table_id):
+    table = soup.find("table", id=table_id)
+    # Si la table n'est pas trouvée et que l'id se termine par '-splits', on tente avec l'id alternatif
+    if not table and table_id.endswith("-splits"):
+        alt_id = f"{table_id}-chall"
+        table_alt = soup.find("table", id=alt_id)
+        if table_alt:
+            logging.info(f"Table {table_id} not found, using alternative {alt_id}")
+            table = table_alt
+    return table
+
+def parse_player_page(page_bytes, player_url, parser=DEFAULT_HTML_PARSER):
+    """
+    Parse every stat table of a raw player page.
+    Runs in the parse process pool, so it only takes and returns plain values.
+    Returns: {table_key: (headers, rows)} with rows as tuples of cell texts
+    """
+    soup = BeautifulSoup(page_bytes, parser)
+    parsed_tables = {}
+
+    for key, table_id in tables.items():
+        try:
+            table = find_stat_table(soup, table_id)
+            if not table:
+                logging.warning(f"Table {table_id} not found for {player_url}")
+                continue
+
+            headers = tuple(clean_nbsp(th.get_text(" ", strip=True)) for th in table.find("thead").find_all("th"))
+            rows = []
+            for tr in table.find("tbody").find_all("tr"):
+                cells = tuple(clean_nbsp(td.get_text(" ", strip=True)) for td in tr.find_all("td"))
+                if cells:
+                    rows.append(cells)
+
+            if not rows:
+                logging.warning(f"No data rows found in table {table_id} for {player_url}")
                 continue
-        
+
+            parsed_tables[key] = (headers, tuple(rows))
+
+        except Exception as e:
+            logging.error(f"Error processing table {key} for {player_url}: {e}")
+            continue
+
+    return parsed_tables
+
+_RESULT_NOISE_RE = re.compile(r"\(.*?\)|\[.*?\]")
+
+def _folded_letters(text):
+    # "Félix Auger-Aliassime" et le slug "FelixAugerAliassime" donnent tous deux "felixaugeraliassime"
+    return fold_name(text).replace(" ", "")
+
+def opponent_from_result(description, player_url):
+    """
+    Opponent of the player in a recent-results description such as
+    "(1)Jannik Sinner d. Alexander Zverev [GER]"; the whole description
+    when the player cannot be recognized on either side.
+    """
+    sides = [" ".join(_RESULT_NOISE_RE.sub("", side).split()) for side in description.split(" d. ", 1)]
+    if len(sides) == 2:
+        player = _folded_letters(player_url.rsplit("p=", 1)[-1])
+        for side, other in (sides, sides[::-1]):
+            if side and _folded_letters(side) in player:
+                return other
+    return description
+
+@metrics.timed("build_player_frames")
+def build_player_frames(parsed_tables, player_url, scraped_at):
+    """Turn the parsed row tuples of a player page into DataFrames keyed by Supabase table"""
+    player_tables = {}
+    for key, (headers, rows) in parsed_tables.items():
+        try:
+            df = pd.DataFrame(list(rows), columns=list(headers))
+            df.columns = make_columns_unique(df.columns)
+            if key == "recent_results" and "" in df.columns and "opponent" not in df.columns:
+                # Colonne sans en-tête "X d. Y" : on n'en garde que l'adversaire, clé des matchs de poule
+                df["opponent"] = [opponent_from_result(text, player_url) for text in df[""]]
+            # Remove empty or anonymous columns
+            df = df.loc[:, df.columns != '']
+            df.columns = [col.lower() for col in df.columns]
+            df['scraped_at'] = scraped_at
+            df['player_slug'] = player_url
+
+            logging.info(f"Table {key}: {len(df)} rows found")
+            player_tables[key] = df
+
+        except Exception as e:
+            logging.error(f"Error processing table {key} for {player_url}: {e}")
+            continue
+
+    return player_tables
+
+async def upload_player_tables(player_url, player_tables):
+    """Sync the rows of every given table for this player. Returns the keys written successfully"""
+    written = []
+    for key, df in player_tables.items():
+        try:
+            if await sync_df(key, df, player_url):
+                written.append(key)
+            
+        except Exception as e:
+            logging.error(f"Error processing table {key} for {player_url}: {e}")
+            continue
+    return written
+
+async def fetch_worker(url_queue, parse_queue, client, rate_limiter, driver_pool, page_cache, archive, stats):
+    while True:
+        item = await url_queue.get()
+        if item is None:
+            return
+        i, player_url = item
+        logging.info(f"Processing player {i+1}/{stats['total']}: {player_url}")
+        try:
+            page_source, validators, fetch_method = await fetch_player_page(
+                client, rate_limiter, driver_pool, player_url, page_cache.conditional_headers(player_url))
+            stats["fetch_methods"][fetch_method] += 1
+            if page_source is None:
+                page_cache.hits["not_modified"] += 1
+                stats["unchanged"] += 1
+                logging.info(f"Player {i+1}/{stats['total']} not modified since last run")
+                continue
+            metrics.add("bytes_fetched", len(page_source))
+            archive.store(player_url, page_source)
+            content_hash = hash_page(page_source)
+            if page_cache.page_unchanged(player_url, content_hash):
+                stats["unchanged"] += 1
+                logging.info(f"Player {i+1}/{stats['total']} page unchanged since last run")
+                continue
+            page_meta = {**validators, "content_hash": content_hash}
+            await parse_queue.put((i, player_url, page_source, page_meta))
+        except Exception as e:
+            stats["failed"] += 1
+            logging.error(f"Error fetching player {i+1}/{stats['total']} ({player_url}): {e}")
+
+async def parse_worker(parse_queue, upload_queue, parse_pool, parser, stats):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await parse_queue.get()
+        if item is None:
+            return
+        i, player_url, page_source, page_meta = item
+        try:
+            # Le parsing tourne dans un autre process : il est mesuré ici, attente du pool comprise
+            parse_start = time.perf_counter()
+            parsed_tables = await loop.run_in_executor(parse_pool, parse_player_page, page_source, player_url, parser)
+            metrics.record_stage("parse_player_page", time.perf_counter() - parse_start,
+                                 sum(len(rows) for _, rows in parsed_tables.values()))
+            table_hashes = {key: hash_table(headers, rows) for key, (headers, rows) in parsed_tables.items()}
+            scraped_at = datetime.date.today().isoformat()
+            player_tables = build_player_frames(parsed_tables, player_url, scraped_at)
+            await upload_queue.put((i, player_url, player_tables, table_hashes, page_meta))
+        except Exception as e:
+            stats["failed"] += 1
+            logging.error(f"Error parsing player {i+1}/{stats['total']} ({player_url}): {e}")
+
+async def upload_worker(upload_queue, page_cache, stats):
+    while True:
+        item = await upload_queue.get()
+        if item is None:
+            return
+        i, player_url, player_tables, table_hashes, page_meta = item
+        changed_tables = {key: df for key, df in player_tables.items()
+                          if not page_cache.table_unchanged(player_url, key, table_hashes[key])}
+        if player_tables and not changed_tables:
+            page_cache.commit_page(player_url, page_meta)
+            stats["unchanged"] += 1
+            logging.info(f"Player {i+1}/{stats['total']} tables unchanged since last run")
+            continue
+        try:
+            written = await upload_player_tables(player_url, changed_tables)
+        except Exception as e:
+            written = []
+            logging.error(f"Error uploading player {i+1}/{stats['total']} ({player_url}): {e}")
+        # Les hashes ne sont retenus qu'une fois les lignes vraiment écrites, pas seulement mises en lot
+        def commit(player_url=player_url, written=written, table_hashes=table_hashes, page_meta=page_meta,
+                   page_complete=bool(written) and len(written) == len(changed_tables)):
+            for key in written:
+                page_cache.commit_table(player_url, key, table_hashes[key])
+            if page_complete:
+                page_cache.commit_page(player_url, page_meta)
+        write_buffer.when_flushed(player_url, commit)
+        player_processed = bool(written)
         if player_processed:
-            successful_scrapes += 1
-            logging.info(f"Successfully processed player {i+1}/{len(urls_to_scrape)}")
+            stats["successful"] += 1
+            logging.info(f"Successfully processed player {i+1}/{stats['total']}")
         else:
-            failed_scrapes += 1
-            logging.warning(f"Failed to process any tables for player {i+1}/{len(urls_to_scrape)}")
-            
-    except Exception as e:
-        failed_scrapes += 1
-        logging.error(f"Error processing player {i+1}/{len(urls_to_scrape)} ({player_url}): {e}")
-        # Ensure driver is closed even on error
+            stats["failed"] += 1
+            logging.warning(f"Failed to process any tables for player {i+1}/{stats['total']}")
+
+async def flush_worker(upload_done):
+    """Flush buffered upserts that waited too long while uploads are running"""
+    while not upload_done.is_set():
         try:
-            if 'driver' in locals():
-                driver.quit()
-        except:
+            await asyncio.wait_for(upload_done.wait(), timeout=1.0)
+        except asyncio.TimeoutError:
             pass
-        continue
+        await write_buffer.flush_due()
+    await write_buffer.flush_all()
+
+async def run_uploads(workers, upload_done):
+    await asyncio.gather(*workers)
+    upload_done.set()
+
+async def run_stage(workers, next_queue, next_workers):
+    """Wait for every worker of a stage, then send one stop marker per worker of the next stage"""
+    await asyncio.gather(*workers)
+    for _ in range(next_workers):
+        await next_queue.put(None)
+
+async def scrape_players(urls_to_scrape, driver_pool, parse_pool, parse_workers, parser, page_cache, archive):
+    """
+    Fetch, parse and upload player pages as three overlapping stages linked
+    by bounded queues, so network, parsing and database time run concurrently.
+    Parsing happens in parse_pool, keeping the event loop free to fetch.
+    """
+    stats = {"total": len(urls_to_scrape), "successful": 0, "unchanged": 0, "failed": 0,
+             "fetch_methods": {"http": 0, "selenium": 0}}
+    fetch_workers = max(1, PLAYER_FETCH_CONCURRENCY)
+    upload_workers = max(1, UPLOAD_CONCURRENCY)
+
+    url_queue = asyncio.Queue()
+    parse_queue = asyncio.Queue(maxsize=fetch_workers * 2)
+    upload_queue = asyncio.Queue(maxsize=upload_workers * 2)
+    for item in enumerate(urls_to_scrape):
+        url_queue.put_nowait(item)
+    for _ in range(fetch_workers):
+        url_queue.put_nowait(None)
+
+    upload_done = asyncio.Event()
+    rate_limiter = HostRateLimiter(TENNIS_ABSTRACT_RATE, TENNIS_ABSTRACT_BURST)
+    limits = httpx.Limits(max_connections=fetch_workers, max_keepalive_connections=fetch_workers)
+    async with httpx.AsyncClient(headers=TENNIS_ABSTRACT_HEADERS, timeout=20.0,
+                                 follow_redirects=True, limits=limits) as client:
+        await asyncio.gather(
+            run_stage([fetch_worker(url_queue, parse_queue, client, rate_limiter, driver_pool, page_cache, archive, stats)
+                       for _ in range(fetch_workers)], parse_queue, parse_workers),
+            run_stage([parse_worker(parse_queue, upload_queue, parse_pool, parser, stats)
+                       for _ in range(parse_workers)], upload_queue, upload_workers),
+            run_uploads([upload_worker(upload_queue, page_cache, stats) for _ in range(upload_workers)], upload_done),
+            flush_worker(upload_done),
+        )
+
+    await supabase.aclose()
+
+    # Les joueurs d'un lot en échec seront re-téléchargés au prochain run
+    for player_url in write_buffer.failed_players:
+        page_cache.forget(player_url)
+    stats["write_failed"] = len(write_buffer.failed_players)
+    metrics.add("rows_upserted", write_buffer.rows_written)
+    for key in ("total", "successful", "unchanged", "failed", "write_failed"):
+        metrics.add(f"players_{key}", stats[key])
+    for method, count in stats["fetch_methods"].items():
+        metrics.add(f"pages_fetched_{method}", count)
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Tennis Abstract player stats into Supabase")
+    parser.add_argument("--parser", choices=HTML_PARSERS, default=DEFAULT_HTML_PARSER,
+                        help=f"BeautifulSoup backend used to parse player pages (default: {DEFAULT_HTML_PARSER})")
+    parser.add_argument("--parse-workers", type=int, default=DEFAULT_PARSE_WORKERS,
+                        help=f"Number of processes parsing player pages (default: {DEFAULT_PARSE_WORKERS})")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore the cached pages and re-upload every table (the cache is rewritten)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        logging.critical("SUPABASE_URL and SUPABASE_KEY environment variables are not set or empty.")
+        raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set for the script to run.")
+
+    parse_workers = max(1, args.parse_workers)
+    urls_to_scrape = load_player_urls()
+
+    logging.info(f"Starting to scrape {len(urls_to_scrape)} player URLs...")
+    logging.info(f"Pipeline: fetch_concurrency={PLAYER_FETCH_CONCURRENCY}, parse_workers={parse_workers} ({args.parser}), upload_concurrency={UPLOAD_CONCURRENCY}, tennisabstract_rate={TENNIS_ABSTRACT_RATE}/s")
+    logging.info(f"Chrome driver pool: size={CHROME_POOL_SIZE}, max_pages_per_driver={CHROME_MAX_PAGES_PER_DRIVER}")
+
+    page_cache = PageCache()
+    if not args.refresh:
+        page_cache.load()
+    page_archive = PageArchive("tennis_abstract")
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, ChromeDriverPool() as driver_pool:
+        # Démarre les process de parsing avant que la boucle asyncio ne crée ses threads
+        parse_pool.submit(clean_nbsp, "").result()
+        try:
+            with metrics.stage("scrape_players"):
+                stats = asyncio.run(scrape_players(urls_to_scrape, driver_pool, parse_pool, parse_workers, args.parser,
+                                                   page_cache, page_archive))
+        finally:
+            page_cache.save()
+            page_archive.close()
+            metrics.write()
+
+    successful_scrapes = stats["successful"] + stats["unchanged"]
+    logging.info(f"=== SCRAPING COMPLETE ===")
+    logging.info(f"Successful scrapes: {successful_scrapes} (unchanged since last run: {stats['unchanged']})")
+    logging.info(f"Failed scrapes: {stats['failed']}")
+    logging.info(f"Buffered upserts: {write_buffer.rows_written} rows, {stats['write_failed']} players with failed batches")
+    logging.info(f"Supabase requests: {supabase.requests} (retries: {supabase.retries})")
+    logging.info(f"Page cache hits: {page_cache.hits['not_modified']} not modified (304), {page_cache.hits['unchanged_page']} unchanged pages, {page_cache.hits['unchanged_table']} unchanged tables")
+    logging.info(f"Page cache misses: {page_cache.misses['page']} pages, {page_cache.misses['table']} tables")
+    logging.info(f"Pages fetched over HTTP: {stats['fetch_methods']['http']}, with Chrome fallback: {stats['fetch_methods']['selenium']}")
+    logging.info(f"Chrome drivers launched: {driver_pool.drivers_created} (recycled: {driver_pool.drivers_recycled})")
+    if urls_to_scrape:
+        logging.info(f"Success rate: {successful_scrapes}/{len(urls_to_scrape)} ({successful_scrapes/len(urls_to_scrape)*100:.1f}%)")
 
-logging.info(f"=== SCRAPING COMPLETE ===")
-logging.info(f"Successful scrapes: {successful_scrapes}")
-logging.info(f"Failed scrapes: {failed_scrapes}")
-logging.info(f"Success rate: {successful_scrapes}/{len(urls_to_scrape)} ({successful_scrapes/len(urls_to_scrape)*100:.1f}%)") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+# Codes HTTP pour lesquels une requête idempotente est rejouée
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Un insert simple peut avoir été écrit malgré un 5xx : il n'est rejoué que
+# sur les codes qui garantissent que la requête a été refusée avant la base
+INSERT_RETRY_STATUS_CODES = {429, 503}
+# Erreurs de transport survenues avant l'envoi de la requête
+UNSENT_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+class SupabaseError(Exception):
+    """Error returned by the Supabase REST API, with the PostgREST code when there is one"""
+    def __init__(self, status_code, message, code=None):
+        super().__init__(f"{status_code} - {message}")
+        self.status_code = status_code
+        self.message = message
+        self.code = code
+
+
+class AsyncSupabaseClient:
+    """
+    Async client for the Supabase REST API (PostgREST), shared by both scrapers.
+
+    All requests go through one HTTP/2 connection pool and a semaphore that
+    caps the number of requests in flight, so callers can gather hundreds of
+    chunks without overloading the project's endpoint. Idempotent requests
+    (GET, DELETE, upserts with `on_conflict`) are retried on 408/429/5xx and
+    transport errors; plain inserts only on 429/503 and on connection errors,
+    where the rows cannot have been written, so a retry never duplicates
+    them. Retries use exponential backoff (Retry-After is honoured when
+    present).
+
+    Filters are PostgREST query parameters, e.g. {"player_slug": "eq.x"}.
+    """
+    def __init__(self, url, key, max_concurrency=8, max_retries=4, backoff_base=0.5, timeout=30.0):
+        self.url = url.rstrip('/')
+        self.rest_url = f"{self.url}/rest/v1"
+        self.headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json",
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._http = None
+        self._semaphore = None
+        self.requests = 0
+        self.retries = 0
+        # Durée de chaque tentative par "MÉTHODE table", pour les métriques du run
+        self.latencies = defaultdict(list)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _client(self):
+        # Créé à la première requête pour être lié à la boucle asyncio en cours
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+            self._semaphore = None
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+
+    async def request(self, method, path, params=None, json_data=None, headers=None):
+        """Send one request with retries. `path` is a table name or '' for the API root"""
+        client = self._client()
+        url = f"{self.rest_url}/{path}"
+        # Sérialisé une seule fois, même si la requête est rejouée
+        content = json.dumps(json_data).encode("utf-8") if json_data is not None else None
+        idempotent = method in IDEMPOTENT_METHODS or (method == "POST" and "on_conflict" in (params or {}))
+        retry_status_codes = RETRY_STATUS_CODES if idempotent else INSERT_RETRY_STATUS_CODES
+        retry_transport_errors = httpx.TransportError if idempotent else UNSENT_TRANSPORT_ERRORS
+
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    start = time.perf_counter()
+                    try:
+                        response = await client.request(method, url, params=params, content=content, headers=headers)
+                    finally:
+                        self.latencies[f"{method} {path or '/'}"].append(time.perf_counter() - start)
+                # 416 : page demandée au-delà de la dernière ligne, gérée par select_page
+                if response.status_code < 400 or response.status_code == 416:
+                    return response
+                if response.status_code not in retry_status_codes or attempt == self.max_retries:
+                    raise self._error(response)
+                logging.warning(f"Supabase {method} {path} returned {response.status_code}, retrying (attempt {attempt + 1}/{self.max_retries})")
+            except httpx.TransportError as e:
+                if not isinstance(e, retry_transport_errors) or attempt == self.max_retries:
+                    raise SupabaseError(0, str(e)) from e
+                logging.warning(f"Supabase {method} {path} failed: {e}, retrying (attempt {attempt + 1}/{self.max_retries})")
+            self.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    @staticmethod
+    def _error(response):
+        code = None
+        message = response.text
+        try:
+            body = response.json()
+            if isinstance(body, dict):
+                code = body.get("code")
+                message = body.get("message") or message
+        except ValueError:
+            pass
+        logging.error(f"Supabase API error: {response.status_code} - {response.text}")
+        return SupabaseError(response.status_code, message, code)
+
+    async def openapi(self):
+        """OpenAPI description of the exposed tables (PostgREST root)"""
+        response = await self.request("GET", "", headers={"Accept": "application/openapi+json"})
+        return response.json()
+
+    async def select_page(self, table, columns="*", filters=None, offset=0, limit=1000, order=None, count=False):
+        """
+        Fetch one page of rows with a Range header.
+        Returns: (rows, total) where total is the exact row count when count=True
+        """
+        params = {"select": columns, **(filters or {})}
+        if order:
+            params["order"] = order
+        headers = {"Range-Unit": "items", "Range": f"{offset}-{offset + limit - 1}"}
+        if count:
+            headers["Prefer"] = "count=exact"
+        response = await self.request("GET", table, params=params, headers=headers)
+        total = None
+        content_range = response.headers.get("content-range", "")
+        if "/" in content_range and content_range.rsplit("/", 1)[1] != "*":
+            total = int(content_range.rsplit("/", 1)[1])
+        if response.status_code == 416:
+            return [], total
+        return response.json(), total
+
+    async def select(self, table, columns="*", filters=None, page_size=1000, order=None):
+        """Fetch every matching row, page by page, so the PostgREST max-rows cap never truncates"""
+        rows = []
+        offset = 0
+        while True:
+            page, _ = await self.select_page(table, columns, filters, offset, page_size, order)
+            # Une page courte peut être coupée par max-rows : seule une page vide (ou un 416) marque la fin
+            if not page:
+                return rows
+            rows.extend(page)
+            offset += len(page)
+
+    async def count(self, table, filters=None):
+        _, total = await self.select_page(table, "*", filters, 0, 1, count=True)
+        return total
+
+    async def _write_chunks(self, table, rows, chunk_size, params, prefer):
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        await asyncio.gather(*[
+            self.request("POST", table, params=params, json_data=chunk, headers={"Prefer": prefer})
+            for chunk in chunks
+        ])
+        return len(rows)
+
+    async def insert(self, table, rows, chunk_size=500):
+        """Insert rows in parallel chunks without echoing them back. Returns the number of rows sent"""
+        return await self._write_chunks(table, rows, chunk_size, None, "return=minimal")
+
+    async def upsert(self, table, rows, on_conflict, chunk_size=500, ignore_duplicates=False):
+        """Insert or update rows on the `on_conflict` unique columns, in parallel chunks"""
+        resolution = "ignore-duplicates" if ignore_duplicates else "merge-duplicates"
+        return await self._write_chunks(table, rows, chunk_size, {"on_conflict": on_conflict},
+                                        f"resolution={resolution},return=minimal")
+
+    async def delete(self, table, filters):
+        """Delete the rows matching `filters` (required, PostgREST refuses unfiltered deletes)"""
+        await self.request("DELETE", table, params=filters, headers={"Prefer": "return=minimal"})
+
@@ -0,0 +1,45 @@
+import json
+
+import betclic_scraper_render_optimized as betclic
+
+MATCH_ID = "3001234567"
+
+
+def json_record():
+    match = {
+        "matchId": MATCH_ID,
+        "matchDateUtc": "2026-01-20T08:30:00Z",
+        "competition": {"id": 7, "name": "Open d'Australie"},
+        "contestants": [{"name": "Félix Auger-Aliassime"}, {"name": "Alexander Zverev"}],
+    }
+    script = f'window.__STATE__ = {{"matches":[{json.dumps(match)}]}};'
+    return list(betclic.extract_json_matches([script]))
+
+
+def html_record():
+    card = betclic.EventCard(
+        labels=["F. Auger-Aliassime", "A. Zverev"],
+        href=f"/tennis-stennis/open-d-australie-c7/felix-auger-aliassime-alexander-zverev-m{MATCH_ID}",
+        info_time="Dem. 09:30",
+    )
+    return betclic.extract_html_matches([card])
+
+
+def test_merge_keeps_json_names_and_card_url():
+    for records in (json_record() + html_record(), html_record() + json_record()):
+        matches = betclic.deduplicate_matches(records)
+        assert len(matches) == 1
+        match = matches[0]
+        assert match["player1"] == "Félix Auger-Aliassime"
+        assert match["player2"] == "Alexander Zverev"
+        assert match["tournoi"] == "Open d'Australie"
+        assert match["date"] == "20/01"
+        assert match["match_url"].endswith(f"/open-d-australie-c7/felix-auger-aliassime-alexander-zverev-m{MATCH_ID}")
+
+
+def test_missing_fields_filled_from_other_source():
+    json_only, = json_record()
+    json_only["heure"] = "Unknown"
+    match, = betclic.deduplicate_matches([json_only] + html_record())
+    assert match["heure"] == "09:30"
+    assert match["player1"] == "Félix Auger-Aliassime"
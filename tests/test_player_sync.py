@@ -0,0 +1,94 @@
+import asyncio
+
+import player_stats_scraper as player_stats
+from supabase_client import SupabaseError
+
+
+class FakeClient:
+    """Records the writes; upserts fail like PostgREST without the unique index"""
+    def __init__(self):
+        self.calls = []
+
+    async def upsert(self, table, rows, on_conflict, chunk_size=500):
+        self.calls.append(("upsert", table, len(rows)))
+        raise SupabaseError(400, "there is no unique or exclusion constraint matching the ON CONFLICT specification",
+                            player_stats.NO_UNIQUE_INDEX_CODE)
+
+    async def delete(self, table, filters):
+        self.calls.append(("delete", table, filters["player_slug"]))
+
+    async def insert(self, table, rows, chunk_size=500):
+        self.calls.append(("insert", table, len(rows)))
+
+
+def test_missing_unique_index_falls_back_to_delete_and_insert():
+    client = FakeClient()
+    buffer = player_stats.WriteBuffer(client, batch_size=2)
+    records = [{"player_slug": "p", "split": name, "m": "1"} for name in ("Career", "Hard", "Clay")]
+    committed = []
+
+    async def main():
+        # Deux lots pour le même joueur : une seule réécriture de ses trois lignes
+        await buffer.add("career_splits", records, "player_slug,split", "p", records)
+        buffer.when_flushed("p", lambda: committed.append("p"))
+        await buffer.flush_all()
+
+    asyncio.run(main())
+    assert buffer.tables_without_index == {"career_splits"}
+    assert [call for call in client.calls if call[0] != "upsert"] == [
+        ("delete", "career_splits", "eq.p"),
+        ("insert", "career_splits", 3),
+    ]
+    assert not buffer.failed_players
+    assert committed == ["p"]
+
+
+def test_opponent_from_result_folds_accents():
+    url = "https://www.tennisabstract.com/cgi-bin/player.cgi?p=FelixAugerAliassime"
+    assert player_stats.opponent_from_result("(3)Félix Auger-Aliassime [CAN] d. Alexander Zverev [GER]", url) == "Alexander Zverev"
+    assert player_stats.opponent_from_result("Tomás Martín Etcheverry [ARG] d. (3)Félix Auger-Aliassime", url) == "Tomás Martín Etcheverry"
+    # Joueur reconnu sur aucun des deux côtés : description entière
+    assert player_stats.opponent_from_result("Carlos Alcaraz d. Jannik Sinner", url) == "Carlos Alcaraz d. Jannik Sinner"
+
+
+def test_natural_key_columns():
+    result = {"date": "2025-01-13", "tournament": "Australian Open", "rd": "R64", "opponent": "X",
+              "score": "6-4", "scraped_at": "now", "player_slug": "p"}
+    assert player_stats.natural_key_columns("recent_results", [result]) == \
+        ("player_slug", "date", "tournament", "rd", "opponent")
+    split = {"scraped_at": "now", "split": "Career", "m": "10", "player_slug": "p"}
+    assert player_stats.natural_key_columns("career_splits", [split]) == ("player_slug", "split")
+    # Colonne de la clé absente en base : pas de clé, réécriture complète
+    del result["opponent"]
+    assert player_stats.natural_key_columns("recent_results", [result]) is None
+
+
+def test_pgrst_filter_quotes_reserved_characters():
+    assert player_stats.pgrst_filter("rd", None) == "rd.is.null"
+    assert player_stats.pgrst_filter("tournament", "Queen's Club, London (1)") == \
+        'tournament.eq."Queen\'s Club, London (1)"'
+    assert player_stats.pgrst_filter("opponent", 'A "B" \\ C') == 'opponent.eq."A \\"B\\" \\\\ C"'
+
+
+def test_gone_rows_are_deleted_with_one_or_filter():
+    deletes = []
+
+    class Client:
+        async def select(self, table, filters=None):
+            return [{"player_slug": "p", "date": "2025-01-13", "tournament": "Doha, Qatar", "rd": "RR", "opponent": "A"},
+                    {"player_slug": "p", "date": "2025-01-13", "tournament": "Doha, Qatar", "rd": "RR", "opponent": None}]
+
+        async def delete(self, table, filters):
+            deletes.append(filters)
+
+    records = [{"player_slug": "p", "date": "2025-01-13", "tournament": "Doha, Qatar", "rd": "RR", "opponent": "A"}]
+    key_columns = ("player_slug", "date", "tournament", "rd", "opponent")
+    original = player_stats.supabase
+    player_stats.supabase = Client()
+    try:
+        upserted, deleted = asyncio.run(player_stats.sync_records("recent_results", records, key_columns, "p"))
+    finally:
+        player_stats.supabase = original
+    assert (upserted, deleted) == (0, 1)
+    assert deletes == [{"player_slug": "eq.p",
+                        "or": '(and(date.eq."2025-01-13",tournament.eq."Doha, Qatar",rd.eq."RR",opponent.is.null))'}]
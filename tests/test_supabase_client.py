@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+from supabase_client import AsyncSupabaseClient, SupabaseError
+
+
+def run(statuses, call):
+    """Run `call(client)` against a server answering `statuses` in turn; returns the number of requests sent"""
+    sent = []
+
+    def handler(request):
+        sent.append(request)
+        status = statuses[min(len(sent), len(statuses)) - 1]
+        if isinstance(status, Exception):
+            raise status
+        return httpx.Response(status, json=[])
+
+    async def main():
+        client = AsyncSupabaseClient("https://example.supabase.co", "key", backoff_base=0)
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._semaphore = asyncio.Semaphore(1)
+        async with client:
+            await call(client)
+
+    try:
+        asyncio.run(main())
+    except SupabaseError:
+        pass
+    return len(sent)
+
+
+def test_plain_insert_is_not_retried_on_500():
+    assert run([500, 201], lambda client: client.insert("t", [{"a": 1}])) == 1
+
+
+def test_plain_insert_is_retried_on_503_and_connection_errors():
+    assert run([503, 201], lambda client: client.insert("t", [{"a": 1}])) == 2
+    assert run([httpx.ConnectError("refused"), 201], lambda client: client.insert("t", [{"a": 1}])) == 2
+    assert run([httpx.ReadTimeout("timeout"), 201], lambda client: client.insert("t", [{"a": 1}])) == 1
+
+
+@pytest.mark.parametrize("call", [
+    lambda client: client.upsert("t", [{"a": 1}], on_conflict="a"),
+    lambda client: client.select("t"),
+    lambda client: client.delete("t", {"a": "eq.1"}),
+])
+def test_idempotent_requests_are_retried_on_5xx(call):
+    assert run([502, httpx.ReadTimeout("timeout"), 200], call) == 3
+
+
+def test_select_pages_past_a_max_rows_cap():
+    table = [{"id": i} for i in range(25)]
+
+    def handler(request):
+        # max-rows du serveur à 10, quel que soit le Range demandé
+        first = int(request.headers["range"].split("-")[0])
+        if first >= len(table):
+            return httpx.Response(416, json={})
+        return httpx.Response(206, json=table[first:first + 10])
+
+    async def main():
+        client = AsyncSupabaseClient("https://example.supabase.co", "key")
+        client._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._semaphore = asyncio.Semaphore(1)
+        async with client:
+            return await client.select("t", page_size=1000)
+
+    assert asyncio.run(main()) == table